@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+
+Tests run from any folder: the folder with utils package is put on the path
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import pytest
+from utils.BatchRunner import ScanJob, read_manifest
+
+
+def write_manifest(tmpdir, defaults, scans):
+    manifest_file = os.path.join(str(tmpdir), "campaign.json")
+    with open(manifest_file, 'w') as f:
+        json.dump({"defaults": defaults, "scans": scans}, f)
+    return manifest_file
+
+
+def test_read_manifest_requires_tsync(tmpdir):
+    manifest_file = write_manifest(tmpdir, {}, [{"my_fname": "__a_", "tsync": 5}, {"my_fname": "__b_"}])
+    with pytest.raises(ValueError, match="__b_"):
+        read_manifest(manifest_file)
+
+
+def test_read_manifest_tsync_from_defaults(tmpdir):
+    manifest_file = write_manifest(tmpdir, {"tsync": "auto"}, [{"my_fname": "__a_", "tsync": -3}, {"my_fname": "__b_"}])
+    scans, output_dir = read_manifest(manifest_file)
+    assert [scan["tsync"] for scan in scans] == [-3, "auto"]
+
+
+def test_scan_job_requires_tsync(tmpdir):
+    with pytest.raises(ValueError):
+        ScanJob({"my_fname": "__a_"}, str(tmpdir))
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import pytest
+from utils.SyntheticScan import SyntheticScanGenerator
+from utils.SpectrumReader import SpectrumReader
+from utils.ScanGluer import ScanGluer
+
+
+def test_base_time_offset_rounded_as_notebook(tmpdir):
+    scan_file = os.path.join(str(tmpdir), "spec_scan_2019_10_10__13-18-06.txt")
+    SyntheticScanGenerator(2, 3).write_scan_log(scan_file)
+    gluer = ScanGluer(scan_file)
+    assert gluer.base_time_offset("MPMA_20191010131801.txt") == -6.0
+    assert gluer.base_time_offset("MPMA_20191010131801.txt", rounded=False) == pytest.approx(-6.156254)
+    assert gluer.time_offset(-6.0, 5) == -4.75
+
+
+# spectrometer starts earlier than scanner by time_offset; the closest tsync to -base - time_offset in 0.25 s steps is expected
+@pytest.mark.parametrize("nx, ny, seed, time_offset, tsync", [(12, 20, 0, 6.156, -1), (16, 24, 1, 4.64, 5), (10, 30, 2, 7.9, -8)])
+def test_find_tsync_recovers_synthetic_offset(tmpdir, nx, ny, seed, time_offset, tsync):
+    scan_file = os.path.join(str(tmpdir), "spec_scan_2019_10_10__13-18-06.txt")
+    mpma_file = os.path.join(str(tmpdir), "MPMA_20191010131801.txt")
+    generator = SyntheticScanGenerator(nx, ny, seed)
+    generator.write_scan_log(scan_file)
+    generator.write_mpma(mpma_file, time_offset=time_offset)
+    t, wl, intens = SpectrumReader().read_mpma_spectra(mpma_file, dtype='float32')
+
+    gluer = ScanGluer(scan_file)
+    base = gluer.base_time_offset(mpma_file)
+    best, scores = gluer.find_tsync(t, intens.sum(axis=1, dtype='float64'), base)
+    assert best == tsync
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import numpy as np
+import pytest
+from utils.SpectrumModifier import SpectrumModifier
+
+
+def peak(x, center, width = 1.5):
+    return 3. * np.exp(-0.5 * ((x - center) / width) ** 2) + 0.5 + 0.01 * (x - center)
+
+
+def test_shift_rows_subpixel_matches_shifted_spectrum():
+    x = np.arange(120.)
+    shifts = np.random.RandomState(0).uniform(-6, 6, 20)
+    y = SpectrumModifier().shift_rows_subpixel_2d(np.tile(peak(x, 60.), (20, 1)), shifts)
+    expected = np.array([peak(x, 60. + s) for s in shifts])
+    assert np.abs(y - expected)[:, 10:-10].max() < 1e-3
+
+
+def test_shift_rows_subpixel_keeps_peak_height():
+    # peaks between grid points are moved onto grid points, where the full height has to come back
+    x = np.arange(120.)
+    shifts = np.array([0.5, -0.5, 3.3, -2.7])
+    y2d = np.array([peak(x, 60. - s) for s in shifts])
+    y = SpectrumModifier().shift_rows_subpixel_2d(y2d, shifts)
+    assert y[:, 60] == pytest.approx(peak(x, 60.)[60], rel=1e-3)
+    assert np.all(np.argmax(y, axis=1) == 60)
+
+
+def test_shift_rows_subpixel_edges():
+    y2d = np.tile(peak(np.arange(50.), 25.), (3, 1))
+    y = SpectrumModifier().shift_rows_subpixel_2d(y2d, [3, -2, 10.4])
+    assert np.abs(y[0] - np.r_[[y2d[0, 0]] * 3, y2d[0, :-3]]).max() < 1e-12
+    assert np.abs(y[1] - np.r_[y2d[1, 2:], [y2d[1, -1]] * 2]).max() < 1e-12
+    assert y[2, :10] == pytest.approx(y2d[2, 0], abs=1e-4)
+    assert not np.isnan(y).any()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import numpy as np
+from utils.pyOESconsts import Consts
+
+
+class BalmerTemperature:
+    """
+        Electron temperature from hydrogen Balmer lines by Boltzmann plot for every spectrum (pixel) of the matrix at once:
+            ln(I * lambda / (g_k * A_ki)) = -E_k / Te + const
+        With two lines (H_a, H_b) it is the same as two-line formula of notebook 2.
+    """
+
+    def __init__(self, lines = ('656nm 3to2 Red 1.89eV', '486nm 4to2 Aqua 2.55eV'), half_width = 60.):
+        """
+            Constructor
+            @param lines: keys of Consts.H_BETTA_ANG used for the plot (default H_a and H_b)
+            @param half_width: half width in A of the window around every line (default 60A, as "6506.94":"6625.87" in notebook 2)
+
+            @return: no return value
+        """
+        self.lines = list(lines)
+        self.half_width = half_width
+        self.wavelength = np.array([Consts.H_BETTA_ANG[line] for line in self.lines])
+        atomic = np.array([Consts.H_BALMER_ATOMIC_DATA[line] for line in self.lines], dtype='float64')
+        self.energy = Consts.RYDBERG_H_EV * (1. - 1. / atomic[:, 0] ** 2)
+        self.g_k, self.a_ki = atomic[:, 1], atomic[:, 2]
+
+    def line_intensities(self, wl, intens, mode = 'peak'):
+        """
+            Intensities of all lines for all spectra; every window is found by binary search in the wavelength axis
+            @param wl: np.array of wavelength in A (sorted)
+            @param intens: 2D np.array (n_spectra, len(wl))
+            @param string mode: 'peak' - maximum in the window (as notebook 2), 'integral' - trapezoid integral over the window
+
+            @return 2D np.array (n_spectra, n_lines)
+        """
+        intens = np.asarray(intens)
+        lo = np.searchsorted(wl, self.wavelength - self.half_width, side='left')
+        hi = np.searchsorted(wl, self.wavelength + self.half_width, side='right')
+        result = np.full((intens.shape[0], len(self.lines)), np.nan)
+        for k in range(len(self.lines)):
+            if hi[k] - lo[k] < 1:
+                continue
+            window = intens[:, lo[k]:hi[k]]
+            if mode == 'peak':
+                result[:, k] = window.max(axis=1)
+            elif mode == 'integral':
+                dx = np.diff(wl[lo[k]:hi[k]])
+                result[:, k] = np.dot(0.5 * (window[:, 1:] + window[:, :-1]), dx)
+            else:
+                raise ValueError("Unknown mode '" + mode + "', use 'peak' or 'integral'")
+        return result
+
+    def boltzmann_fit(self, line_intens):
+        """
+            Closed-form least squares line fit of Boltzmann plot for every spectrum. Lines with non-positive intensity are skipped
+            @param line_intens: 2D np.array (n_spectra, n_lines) from line_intensities
+
+            @return (te, r2, n_used) : np.arrays of electron temperature in eV (NaN if less than 2 lines), coefficient of determination
+                (1 for two lines) and number of used lines
+        """
+        with np.errstate(divide='ignore', invalid='ignore'):
+            y = np.log(line_intens * self.wavelength / (self.g_k * self.a_ki))
+        w = np.isfinite(y).astype('float64')
+        y = np.where(w > 0, y, 0.)
+        x = self.energy[np.newaxis, :]
+        n = w.sum(axis=1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x_mean = (w * x).sum(axis=1) / n
+            y_mean = (w * y).sum(axis=1) / n
+            dx = (x - x_mean[:, np.newaxis]) * w
+            dy = (y - y_mean[:, np.newaxis]) * w
+            slope = (dx * dy).sum(axis=1) / (dx * dx).sum(axis=1)
+            ss_res = ((dy - slope[:, np.newaxis] * dx) ** 2).sum(axis=1)
+            r2 = 1. - ss_res / (dy * dy).sum(axis=1)
+            te = -1. / slope
+        te[n < 2] = np.nan
+        return te, r2, n.astype(int)
+
+    def electron_temperature(self, wl, intens, mode = 'peak'):
+        """
+            Te map for the spectra matrix: line intensities and Boltzmann plot in one pass
+            @param wl: np.array of wavelength in A (sorted)
+            @param intens: 2D np.array (n_spectra, len(wl))
+            @param string mode: 'peak' or 'integral' (see line_intensities)
+
+            @return (te, r2, n_used, line_intens) : see boltzmann_fit; line_intens - (n_spectra, n_lines), e.g. H_a, H_b maps
+        """
+        line_intens = self.line_intensities(wl, intens, mode)
+        te, r2, n_used = self.boltzmann_fit(line_intens)
+        return te, r2, n_used, line_intens
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+
+Batch processing of many scans (notebooks 1 -> 2 -> 3a without editing _myconfig.py), e.g.
+    python -m utils.BatchRunner campaign.json --jobs 4
+
+campaign.json:
+    {"output_dir": "batch",
+     "defaults": {"model": "random_forest_models/forest40ch_npy"},
+     "scans": [{"raw_Kud": "spec_scan_2019_10_10__13-18-06.txt", "raw_Mal": "MPMA_20191010131801.txt",
+                "my_fname": "__118_13_18_", "tsync": 5}]}
+Relative paths are taken from the manifest folder. tsync has the meaning of _myconfig.py (steps of 0.25 s added to the
+file name offset rounded as in notebook, see ScanGluer.base_time_offset), so hand-tuned values can be copied from there.
+tsync is required for every scan: a wrong one glues spectra to wrong pixels without any error. "auto" has to be given
+explicitly, it chooses tsync by ScanGluer.find_tsync and keeps the scores in glue.done.json for checking.
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.SpectrumReader import SpectrumReader
+from utils.ScanGluer import ScanGluer
+from utils.RasterCube import RasterCube
+from utils.BalmerTemperature import BalmerTemperature
+from utils.SwanSpectrumStandardizator import SwanSpectrumStandardizator
+
+STAGES = ("glue", "cube", "balmer", "swan", "tg")
+
+
+class ScanJob:
+    """
+        Processing of one scan as a chain of checkpointed stages:
+            glue   - MPMA reading and time join with scan log (explicit tsync or "auto"), glue.npy, spectra.npy
+            cube   - first spectrum of every cell into RasterCube (the same as drop_duplicates in notebook 2)
+            balmer - H_a, H_b, Te layers
+            swan   - batch standardization of Swan band (0,0), swan_std.npy ("alignment": "integer", "parabolic" or "xcorr")
+            tg     - Trot, Tvib layers predicted by exported random forest (ForestModel)
+        Every finished stage writes <stage>.done.json with a stamp - hash of its parameters and of the previous stage stamp.
+        Stage is skipped when its stamp is unchanged, so after a crash or a parameter change the job continues from the first invalid stage.
+    """
+
+    def __init__(self, scan, output_dir):
+        """
+            Constructor
+            @param dict scan: scan description (raw_Kud, raw_Mal, my_fname, tsync, model, balmer_lines, ...)
+            @param string output_dir: root of per-scan output folders
+
+            @return: no return value
+            @raise ValueError: scan has no tsync
+        """
+        if scan.get("tsync") is None:
+            raise ValueError("Scan %s has no tsync: give the value from _myconfig.py or \"auto\"" % scan.get("my_fname"))
+        self.scan = scan
+        self.dir = os.path.join(output_dir, scan["my_fname"].strip("_") or "scan")
+        self.cube_dir = os.path.join(self.dir, "cube")
+        self.log = []
+
+    def _file_signature(self, file_name):
+        st = os.stat(file_name)
+        return [os.path.abspath(file_name), st.st_size, st.st_mtime_ns]
+
+    def stage_params(self, stage):
+        scan = self.scan
+        if stage == "glue":
+            return {"kud": self._file_signature(scan["raw_Kud"]), "mal": self._file_signature(scan["raw_Mal"]),
+                    "tsync": scan["tsync"], "dtype": scan.get("dtype", "float32")}
+        if stage == "balmer":
+            return {"lines": scan.get("balmer_lines"), "half_width": scan.get("balmer_half_width", 60.),
+                    "mode": scan.get("balmer_mode", "peak")}
+        if stage == "swan":
+            return {"alignment": scan.get("alignment", "integer")}
+        if stage == "tg":
+            model = scan.get("model")
+            return {"model": self._file_signature(os.path.join(model, "meta.json")) if model else None}
+        return {}
+
+    def stamp(self, stage, previous):
+        text = json.dumps([stage, self.stage_params(stage), previous], sort_keys=True)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+    def _done_file(self, stage):
+        return os.path.join(self.dir, stage + ".done.json")
+
+    def is_done(self, stage, stamp):
+        path = self._done_file(stage)
+        if not os.path.exists(path):
+            return False
+        with open(path, 'r') as f:
+            return json.load(f).get("stamp") == stamp
+
+    def mark_done(self, stage, stamp, info):
+        with open(self._done_file(stage), 'w') as f:
+            json.dump({"stamp": stamp, "info": info}, f)
+
+    def run(self):
+        """
+            Runs all stages which are not valid yet
+
+            @return list of (stage, status, seconds)
+        """
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+        previous = ""
+        for stage in STAGES:
+            stamp = self.stamp(stage, previous)
+            if self.is_done(stage, stamp):
+                self.log.append((stage, "cached", 0.))
+            else:
+                # downstream stamps depend on this one, they become invalid automatically
+                if os.path.exists(self._done_file(stage)):
+                    os.remove(self._done_file(stage))
+                started = time.time()
+                info = getattr(self, "stage_" + stage)()
+                self.mark_done(stage, stamp, info)
+                self.log.append((stage, "done", time.time() - started))
+            previous = stamp
+        return self.log
+
+    def stage_glue(self):
+        reader = SpectrumReader()
+        t, wl, intens = reader.read_mpma_spectra(self.scan["raw_Mal"], dtype=self.scan.get("dtype", "float32"))
+        gluer = ScanGluer(self.scan["raw_Kud"])
+        base = gluer.base_time_offset(self.scan["raw_Mal"])
+        tsync = self.scan["tsync"]
+        info = {}
+        if tsync == "auto":
+            candidates = np.arange(-20, 21)
+            tsync, scores = gluer.find_tsync(t, intens.sum(axis=1, dtype='float64'), base, candidates)
+            # a small margin to the runner-up means the choice should be checked by hand
+            runner_up = np.sort(scores)[1]
+            info = {"tsync_auto": True, "tsync_margin": float(runner_up / scores.min() - 1),
+                    "tsync_scores": dict(zip(candidates.tolist(), scores.tolist()))}
+        offset = gluer.time_offset(base, tsync)
+        pos = gluer.glue(t, offset)
+        np.save(os.path.join(self.dir, "glue.npy"), pos)
+        np.save(os.path.join(self.dir, "spectra.npy"), intens)
+        np.save(os.path.join(self.dir, "wavelength.npy"), 10 * wl)
+        info.update({"tsync": float(tsync), "time_offset": float(offset), "n_spectra": int(len(t))})
+        return info
+
+    def stage_cube(self):
+        intens = np.load(os.path.join(self.dir, "spectra.npy"), mmap_mode='r')
+        wl = np.load(os.path.join(self.dir, "wavelength.npy"))
+        gluer = ScanGluer(self.scan["raw_Kud"])
+        pos = np.load(os.path.join(self.dir, "glue.npy"))
+        keep = gluer.first_spectrum_per_cell(pos)
+        cube = RasterCube(self.cube_dir).create(wl, gluer.resolution[0], gluer.resolution[1], dtype=intens.dtype)
+        cube.write_spectra(gluer.x[pos[keep]], gluer.y[pos[keep]], intens[keep])
+        cube.close()
+        return {"n_pixels": int(len(keep))}
+
+    def stage_balmer(self):
+        cube = RasterCube(self.cube_dir).open()
+        x, y, wl, intens = cube.pixel_spectra()
+        lines = self.scan.get("balmer_lines") or ['656nm 3to2 Red 1.89eV', '486nm 4to2 Aqua 2.55eV']
+        balmer = BalmerTemperature(lines, self.scan.get("balmer_half_width", 60.))
+        te, r2, n_used, line_intens = balmer.electron_temperature(wl, intens, self.scan.get("balmer_mode", "peak"))
+        cube.add_layer("Te", te, x, y)
+        cube.add_layer("Te_r2", r2, x, y)
+        # H_a, H_b keep the names used by notebooks, other lines are named by Consts.H_BETTA_ANG keys
+        names = {'656nm 3to2 Red 1.89eV': "H_a", '486nm 4to2 Aqua 2.55eV': "H_b"}
+        for k, line in enumerate(balmer.lines):
+            cube.add_layer(names.get(line, line), line_intens[:, k], x, y)
+        return {"lines": balmer.lines}
+
+    def stage_swan(self):
+        cube = RasterCube(self.cube_dir).open()
+        x, y, wl, intens = cube.pixel_spectra(5033. - 100., 5220. + 100.)
+        x_std, y_std = SwanSpectrumStandardizator().get_std_xy_2d(wl / 10., intens, alignment=self.scan.get("alignment", "integer"))
+        np.save(os.path.join(self.dir, "swan_std.npy"), y_std)
+        np.save(os.path.join(self.dir, "swan_xy.npy"), np.stack((x, y)))
+        return {"n_pixels": int(len(x))}
+
+    def stage_tg(self):
+        model = self.scan.get("model")
+        if not model:
+            return {"skipped": "no model"}
+        from utils.ForestModel import ForestPredictor
+        y_std = np.load(os.path.join(self.dir, "swan_std.npy"))
+        x, y = np.load(os.path.join(self.dir, "swan_xy.npy"))
+        features = y_std[:, 5:45].copy()
+        features[np.isnan(features)] = 0
+        t_predict = ForestPredictor(model).predict(features, n_threads=self.scan.get("threads", 4))
+        cube = RasterCube(self.cube_dir).open()
+        cube.add_layer("Trot", t_predict[:, 0], x, y)
+        cube.add_layer("Tvib", t_predict[:, 1], x, y)
+        return {"model": model}
+
+
+def run_scan(args):
+    # top-level function - it is pickled and sent to worker processes
+    scan, output_dir = args
+    try:
+        return scan["my_fname"], ScanJob(scan, output_dir).run(), None
+    except Exception as e:
+        return scan["my_fname"], [], repr(e)
+
+
+def read_manifest(manifest_file):
+    """
+        Reads campaign manifest; scan entries are merged with "defaults", relative paths are taken from manifest folder
+        @param string manifest_file: json file
+
+        @return (scans, output_dir) : list of scan dicts and output folder
+        @raise ValueError: scans without tsync, all of them are listed before anything is processed
+    """
+    with open(manifest_file, 'r') as f:
+        manifest = json.load(f)
+    root = os.path.dirname(os.path.abspath(manifest_file))
+    scans = []
+    for entry in manifest["scans"]:
+        scan = dict(manifest.get("defaults", {}))
+        scan.update(entry)
+        for key in ("raw_Kud", "raw_Mal", "model"):
+            if scan.get(key):
+                scan[key] = os.path.join(root, scan[key])
+        scans.append(scan)
+    missing = [scan.get("my_fname", "?") for scan in scans if scan.get("tsync") is None]
+    if missing:
+        raise ValueError("tsync is not given for scans %s; set it per scan or in defaults (\"auto\" to detect)"
+                         % ", ".join(missing))
+    return scans, os.path.join(root, manifest.get("output_dir", "batch"))
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Batch processing of OES raster scans with per-stage checkpoints")
+    parser.add_argument("manifest", help="json manifest with scans")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes (default - number of CPUs)")
+    args = parser.parse_args(argv)
+
+    scans, output_dir = read_manifest(args.manifest)
+    tasks = [(scan, output_dir) for scan in scans]
+    if args.jobs == 1:
+        results = list(map(run_scan, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+            results = list(executor.map(run_scan, tasks))
+    failed = 0
+    for name, log, error in results:
+        if error is not None:
+            failed += 1
+            print("%s: FAILED %s" % (name, error))
+        else:
+            print("%s: " % name + ", ".join("%s %s %.1fs" % entry for entry in log))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+
+Reproducible benchmark of the processing chain on synthetic raster scans, e.g.
+    python -m utils.Benchmark --sizes 56x100 200x200 --out bench.json
+    python -m utils.Benchmark --sizes 56x100 --out bench_new.json --compare bench.json
+Every stage is timed (best of --repeat runs) and its peak allocation is measured by tracemalloc in a separate run.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+import numpy as np
+from utils.SyntheticScan import SyntheticScanGenerator
+from utils.SpectrumReader import SpectrumReader
+from utils.SpectrumLibrary import SwanSpectrumLibrary
+from utils.ScanGluer import ScanGluer
+from utils.BalmerTemperature import BalmerTemperature
+from utils.SwanSpectrumStandardizator import SwanSpectrumStandardizator
+from utils.TrainingDataStore import TrainingDataGenerator
+from utils.ForestModel import export_forest, ForestPredictor
+from utils.RasterCube import RasterCube
+from utils.MapExporter import MapExporter
+
+
+def measure(func, repeat = 1):
+    """
+        Runs func repeat times for timing and once more under tracemalloc (tracing slows allocations down, so it is not timed)
+        @param func: function without arguments
+        @param int repeat: number of timed runs
+
+        @return (result, seconds, peak_bytes) : result of the last run, best time, peak traced allocation
+    """
+    best = np.inf
+    for i in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def run_size(nx, ny, work_dir, repeat = 1, seed = 0, n_library_files = 200):
+    """
+        Generates synthetic scan of size nx x ny and measures all stages
+        @param int nx, ny: raster size
+        @param string work_dir: folder for generated inputs and outputs
+        @param int repeat: timed runs per stage
+        @param int seed: random seed of synthetic data
+        @param int n_library_files: number of generated SWAN_band files
+
+        @return list of dict records
+    """
+    gen = SyntheticScanGenerator(nx, ny, seed)
+    scan_file = os.path.join(work_dir, "spec_scan_2019_10_10__13-18-06.txt")
+    mpma_file = os.path.join(work_dir, "MPMA_20191010131801.txt")
+    theor_dir = os.path.join(work_dir, "modeled spectra")
+    gen.write_scan_log(scan_file)
+    n_spectra = gen.write_mpma(mpma_file)
+    tr = np.repeat(np.arange(1000., 3000., 2000. / n_library_files * 10), 10)[:n_library_files]
+    tv = np.tile(np.arange(2000., 4500., 250.), n_library_files // 10 + 1)[:n_library_files]
+    gen.write_swan_band_files(theor_dir, tr, tv)
+
+    records = []
+
+    def record(stage, func):
+        result, seconds, peak = measure(func, repeat)
+        records.append({"stage": stage, "size": "%dx%d" % (nx, ny), "n_spectra": int(n_spectra),
+                        "seconds": seconds, "peak_bytes": int(peak)})
+        return result
+
+    reader = SpectrumReader()
+    t, wl, intens = record("read_mpma", lambda: reader.read_mpma_spectra(mpma_file, dtype='float32'))
+
+    def read_swan_library():
+        # library is removed before every run, otherwise build() of later runs only checks existing files
+        lib_dir = os.path.join(work_dir, "lib")
+        shutil.rmtree(lib_dir, ignore_errors=True)
+        return SwanSpectrumLibrary(theor_dir, lib_dir).build(n_jobs=1)
+    record("read_swan_library", read_swan_library)
+
+    gluer = ScanGluer(scan_file)
+    base = gluer.base_time_offset(mpma_file)
+
+    def glue():
+        tsync, scores = gluer.find_tsync(t, intens.sum(axis=1, dtype='float64'), base)
+        pos = gluer.glue(t, gluer.time_offset(base, tsync))
+        return pos, gluer.first_spectrum_per_cell(pos)
+    pos, keep = record("glue", glue)
+    x, y, pixels = gluer.x[pos[keep]], gluer.y[pos[keep]], intens[keep]
+
+    standardizator = SwanSpectrumStandardizator()
+    x_std, y_std = record("standardize", lambda: standardizator.get_std_xy_2d(wl, pixels))
+    record("te", lambda: BalmerTemperature().electron_temperature(10 * wl, pixels))
+
+    # imported here: sklearn is needed only to train the benchmark forest, prediction goes by ForestPredictor
+    from sklearn.ensemble import RandomForestRegressor
+    library_tr, library_tv = np.meshgrid(np.arange(1000., 3000., 40.), np.arange(2000., 4500., 100.))
+    store = TrainingDataGenerator(n_noisy=1, seed=seed).generate(os.path.join(work_dir, "training"), library_tr, library_tv)
+    rf = RandomForestRegressor(n_estimators=50, random_state=seed).fit(store.features, store.labels)
+    model_dir = os.path.join(work_dir, "model")
+    export_forest(rf, model_dir)
+    del rf, store
+    features = y_std[:, 5:45].copy()
+    features[np.isnan(features)] = 0
+    t_predict = record("tg", lambda: ForestPredictor(model_dir).predict(features))
+
+    cube_dir = os.path.join(work_dir, "cube")
+    cube = RasterCube(cube_dir).create(10 * wl, gluer.resolution[0], gluer.resolution[1])
+    cube.write_spectra(x, y, pixels)
+    cube.add_layer("Trot", t_predict[:, 0], x, y)
+    cube.add_layer("Tvib", t_predict[:, 1], x, y)
+    cube.close()
+    record("map_export", lambda: MapExporter(cube_dir, os.path.join(work_dir, "img")).export('all', 'all', jobs=1))
+    return records
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "platform": platform.platform(),
+            "processor": platform.processor(), "cpu_count": os.cpu_count(), "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def compare(records, reference, threshold = 1.2, min_seconds = 0.05):
+    """
+        Prints time and memory ratios against reference run
+        @param list records: current records
+        @param list reference: records of reference run
+        @param float threshold: ratio reported as regression (default 1.2)
+        @param float min_seconds: time changes below this are timer noise and are not reported (default 0.05s)
+
+        @return int : number of regressions
+    """
+    ref = dict(((r["stage"], r["size"]), r) for r in reference)
+    regressions = 0
+    for r in records:
+        old = ref.get((r["stage"], r["size"]))
+        if old is None:
+            continue
+        t_ratio = r["seconds"] / max(old["seconds"], 1e-9)
+        m_ratio = r["peak_bytes"] / max(old["peak_bytes"], 1)
+        slower = t_ratio > threshold and r["seconds"] - old["seconds"] > min_seconds
+        flag = "REGRESSION" if slower or m_ratio > threshold else ""
+        regressions += bool(flag)
+        print("%-18s %-9s time x%.2f  memory x%.2f %s" % (r["stage"], r["size"], t_ratio, m_ratio, flag))
+    return regressions
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Benchmark of OES processing stages on synthetic raster scans")
+    parser.add_argument("--sizes", nargs="+", default=["56x100"], help="raster sizes, e.g. 56x100 500x500")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per stage, best time is reported")
+    parser.add_argument("--seed", type=int, default=0, help="random seed of synthetic data")
+    parser.add_argument("--out", default="bench.json", help="json file with results")
+    parser.add_argument("--compare", default=None, help="json file of a previous run")
+    parser.add_argument("--keep", default=None, help="folder for generated inputs (default - temporary, removed)")
+    args = parser.parse_args(argv)
+
+    records = []
+    for size in args.sizes:
+        nx, ny = [int(v) for v in size.lower().split("x")]
+        work_dir = args.keep or tempfile.mkdtemp(prefix="oes_bench_")
+        work_dir = os.path.join(work_dir, size) if args.keep else work_dir
+        if not os.path.exists(work_dir):
+            os.makedirs(work_dir)
+        try:
+            records.extend(run_size(nx, ny, work_dir, args.repeat, args.seed))
+        finally:
+            if not args.keep:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    for r in records:
+        print("%-18s %-9s %9.3f s %10.1f MB" % (r["stage"], r["size"], r["seconds"], r["peak_bytes"] / 2. ** 20))
+    with open(args.out, 'w') as f:
+        json.dump({"environment": environment(), "records": records}, f, indent=1)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            return 1 if compare(records, json.load(f)["records"]) else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from utils.StageProfiler import profiler
+
+
+def float_keys(values):
+    """
+        Order preserving integer keys of float32 values: a < b  <=>  key(a) < key(b) (-0.0 is taken as 0.0)
+        @param values: np.array of floats, converted to float32
+
+        @return np.array of int64 keys in 0 .. 2**32 - 1, the same shape
+    """
+    bits = (np.asarray(values, dtype='float32') + np.float32(0.)).view('uint32').astype('int64')
+    return np.where(bits >= 2 ** 31, 0xFFFFFFFF - bits, bits + 2 ** 31)
+
+
+def _breadth_first_order(tree):
+    # old node ids in breadth first order, children of every node are neighbours (left, right)
+    left, right = tree.children_left, tree.children_right
+    level = np.array([0])
+    order = [level]
+    while level.size:
+        inner = level[left[level] >= 0]
+        level = np.column_stack((left[inner], right[inner])).ravel()
+        order.append(level)
+    return np.concatenate(order)
+
+
+def export_forest(rf, path):
+    """
+        Flattens trained sklearn RandomForestRegressor into contiguous arrays (folder of .npy files):
+            nodes.npy (n_nodes,) int64 - one word per node: bits 0..31 - threshold as float_keys of the largest float32 not above it,
+                bits 32.. - feature, higher bits - distance to the left child (the right child is the next node); leaf is a node
+                with distance 0 and maximal threshold key, i.e. it leads to itself
+            value.npy (n_nodes, n_outputs) float64, roots.npy (n_trees,) index of root node of every tree, meta.json
+        Nodes of every tree are stored breadth first, so the top levels used by every sample are close together.
+        Files are opened by ForestPredictor with memory mapping, several processes share one copy in the page cache.
+        @param rf: fitted RandomForestRegressor (e.g. 'forest40chMOSTandNoise3add_estim50_dep50...')
+        @param string path: model folder
+
+        @return: no return value
+        @raise ValueError: if a tree is too large for the node word
+    """
+    trees = [est.tree_ for est in rf.estimators_]
+    n_features = int(rf.n_features_in_ if hasattr(rf, "n_features_in_") else rf.n_features_)
+    feature_bits = max(1, int(np.ceil(np.log2(n_features))))
+    max_distance = 2 ** (31 - feature_bits)
+    nodes, values, roots = [], [], []
+    root = 0
+    for t in trees:
+        order = _breadth_first_order(t)
+        position = np.empty(len(order), dtype='int64')
+        position[order] = np.arange(len(order))
+        leaf = t.children_left[order] < 0
+        distance = np.where(leaf, 0, position[np.maximum(t.children_left[order], 0)] - np.arange(len(order)))
+        if distance.max() >= max_distance:
+            raise ValueError("Tree of %d nodes is too large for %d features" % (len(order), n_features))
+        # sklearn compares float32 features with float64 thresholds: x <= t  <=>  x <= largest float32 not above t
+        threshold = t.threshold[order]
+        threshold32 = threshold.astype('float32')
+        above = threshold32.astype('float64') > threshold
+        threshold32[above] = np.nextafter(threshold32[above], np.float32(-np.inf))
+        key = np.where(leaf, 0xFFFFFFFF, float_keys(threshold32))
+        feature = np.where(leaf, 0, t.feature[order]).astype('int64')
+        nodes.append((distance << (32 + feature_bits)) | (feature << 32) | key)
+        values.append(t.value[order, :, 0])
+        roots.append(root)
+        root += len(order)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    np.save(os.path.join(path, "nodes.npy"), np.concatenate(nodes))
+    np.save(os.path.join(path, "value.npy"), np.concatenate(values).astype('float64'))
+    np.save(os.path.join(path, "roots.npy"), np.array(roots, dtype='int64'))
+    meta = {"n_trees": len(trees), "n_features": n_features, "n_outputs": int(rf.n_outputs_), "feature_bits": feature_bits,
+            "max_depth": int(max(t.max_depth for t in trees))}
+    with open(os.path.join(path, "meta.json"), 'w') as f:
+        json.dump(meta, f)
+
+
+class ForestPredictor:
+    """
+        Batched vectorized random forest inference over model exported by export_forest.
+        A block of samples goes through all trees at once, one numpy step per tree level; (sample, tree) pairs which have
+        reached a leaf are dropped, and the block is small enough for its features to stay in cache. Every step reads one
+        node word and one feature key per pair, comparisons are done on integer keys.
+        On one core it is a little faster than rf.predict (20000 x 40 features, 30 trees of depth 24, median of interleaved
+        runs: 0.113 s vs 0.132 s), large batches are split between threads.
+    """
+
+    def __init__(self, path):
+        """
+            Constructor, opens model files by memory mapping (milliseconds instead of unpickling)
+            @param string path: model folder written by export_forest
+
+            @return: no return value
+        """
+        with open(os.path.join(path, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        # plain ndarray views of the memory maps are cheaper to index in the traversal loop
+        for name in ("nodes", "value", "roots"):
+            setattr(self, name, np.asarray(np.load(os.path.join(path, name + ".npy"), mmap_mode='r')))
+
+    def predict(self, X, n_threads = 4, chunk_size = 1024):
+        """
+            Predicts targets (e.g. Trot, Tvib) as mean of tree leaf values, the same as rf.predict
+            @param X: 2D np.array (n_samples, n_features)
+            @param int n_threads: number of threads for batches larger than chunk_size (default 4)
+            @param int chunk_size: samples per block, one block is one thread task (default 1024)
+
+            @return 2D np.array (n_samples, n_outputs), or 1D np.array (n_samples,) for a single output forest as rf.predict
+        """
+        X = np.asarray(X)
+        with profiler.stage("predict", X):
+            if len(X) <= chunk_size:
+                return self.predict_chunk(X)
+            bounds = range(0, len(X), chunk_size)
+            if n_threads == 1:
+                parts = [self.predict_chunk(X[i:i + chunk_size]) for i in bounds]
+            else:
+                with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                    parts = list(executor.map(lambda i: self.predict_chunk(X[i:i + chunk_size]), bounds))
+            return np.concatenate(parts)
+
+    def predict_chunk(self, X):
+        """
+            Prediction of one block in the calling thread (see predict)
+            @param X: 2D np.array (n_samples, n_features)
+
+            @return np.array (n_samples, n_outputs), or (n_samples,) for a single output forest
+        """
+        keys = float_keys(X)
+        n_samples, n_features = keys.shape
+        keys = keys.ravel()
+        n_trees = len(self.roots)
+        feature_mask = 2 ** self.meta["feature_bits"] - 1
+        distance_shift = 32 + self.meta["feature_bits"]
+        # one (sample, tree) pair per element: current node and offset of the sample features in keys
+        node = np.tile(self.roots, n_samples)
+        offset = np.repeat(np.arange(n_samples, dtype='int64') * n_features, n_trees)
+        total = np.zeros((self.value.shape[1], n_samples))
+        level = 0
+        while node.size:
+            word = self.nodes.take(node)
+            index = (word >> 32) & feature_mask
+            index += offset
+            step = word >> distance_shift
+            step += keys.take(index) > (word & 0xFFFFFFFF)
+            node += step
+            level += 1
+            # leaves lead to themselves; finished pairs are summed up and dropped every few levels, as compaction costs
+            # more than a step
+            if level % 8 == 0:
+                done = step == 0
+                if done.any():
+                    sample = offset[done] // n_features
+                    leaf_value = self.value.take(node[done], axis=0)
+                    for k in range(len(total)):
+                        total[k] += np.bincount(sample, weights=leaf_value[:, k], minlength=n_samples)
+                    keep = ~done
+                    node, offset = node[keep], offset[keep]
+        prediction = total.T / n_trees
+        if self.meta["n_outputs"] == 1:
+            return prediction[:, 0]
+        return prediction
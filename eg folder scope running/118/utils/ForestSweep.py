@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+
+Parallel hyperparameter sweep of the T_g random forest over TrainingDataStore, e.g.
+    python -m utils.ForestSweep training_store --n-estimators 20 50 100 --max-depth 15 30 50 --jobs 2 --threads 2 --out sweep
+Every configuration is trained in its own process with a time limit ("d30est100 - hung" ends as "timeout" instead of a hung notebook)
+and writes sweep/<config>.json, so a rerun only trains configurations without finished result.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import itertools
+import multiprocessing
+import numpy as np
+from utils.TrainingDataStore import TrainingDataStore
+from utils.ForestModel import export_forest, ForestPredictor
+
+TARGETS = ("Trot", "Tvib")
+
+
+def config_name(config):
+    """
+        @param dict config: RandomForestRegressor parameters
+
+        @return string : file name friendly id, e.g. 'max_depth30_n_estimators50'
+    """
+    return "_".join("%s%s" % (k, config[k]) for k in sorted(config))
+
+
+def grid_configs(grid):
+    """
+        All combinations of parameter lists
+        @param dict grid: {parameter: list of values}, e.g. {"n_estimators": [20, 50], "max_depth": [15, 30]}
+
+        @return list of dicts
+    """
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[k] for k in keys])]
+
+
+def folder_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, dirs, files in os.walk(path) for name in files)
+
+
+def binned_error(true, error, n_bins):
+    """
+        Mean absolute error versus temperature
+        @param true: np.array of true temperatures
+        @param error: np.array of absolute errors
+        @param int n_bins: number of equal temperature bins
+
+        @return dict (edges, mae, count) of lists
+    """
+    edges = np.linspace(true.min(), true.max(), n_bins + 1)
+    index = np.clip(np.searchsorted(edges, true, side='right') - 1, 0, n_bins - 1)
+    count = np.bincount(index, minlength=n_bins)
+    total = np.bincount(index, weights=error, minlength=n_bins)
+    mae = np.where(count > 0, total / np.maximum(count, 1), np.nan)
+    return {"edges": edges.tolist(), "mae": mae.tolist(), "count": count.tolist()}
+
+
+def evaluate_config(store_path, config, out_dir, max_train_rows = 200000, test_fraction = 0.2, seed = 0, threads = 1,
+                    n_bins = 10, keep_model = False):
+    """
+        Trains and scores one configuration, result is written to <out_dir>/<config_name>.json.
+        Top-level function - it runs in a separate process.
+        @param string store_path: TrainingDataStore folder
+        @param dict config: RandomForestRegressor parameters
+        @param string out_dir: sweep folder
+        @param int max_train_rows: training rows are subsampled to this number (bounds memory of every worker) (default 200000)
+        @param float test_fraction: test part of the store (default 0.2)
+        @param int seed: random seed of split, subsample and forest (default 0)
+        @param int threads: n_jobs of the forest fit and threads of prediction (default 1)
+        @param int n_bins: temperature bins of error curves (default 10)
+        @param Boolean keep_model: keep exported model in <out_dir>/models (default False)
+
+        @return dict : record
+    """
+    # imported here: sklearn is needed only by the sweep workers
+    from sklearn.ensemble import RandomForestRegressor
+
+    store = TrainingDataStore(store_path).open()
+    train_rows, test_rows = store.split(test_fraction, seed)
+    if len(train_rows) > max_train_rows:
+        train_rows = np.sort(np.random.RandomState(seed).choice(train_rows, max_train_rows, replace=False))
+    X, y = store.features[train_rows], store.labels[train_rows]
+
+    rf = RandomForestRegressor(random_state=seed, n_jobs=threads, **config)
+    started = time.perf_counter()
+    rf.fit(X, y)
+    fit_seconds = time.perf_counter() - started
+    del X, y
+
+    model_dir = os.path.join(out_dir, "models", config_name(config))
+    export_forest(rf, model_dir)
+    del rf
+    predictor = ForestPredictor(model_dir)
+    predict_seconds = 0.
+    true, predicted = [], []
+    for features, labels in store.iter_batches(65536, rows=test_rows):
+        started = time.perf_counter()
+        predicted.append(predictor.predict(features, n_threads=threads))
+        predict_seconds += time.perf_counter() - started
+        true.append(labels)
+    true, predicted = np.concatenate(true).astype('float64'), np.concatenate(predicted)
+
+    error = np.abs(predicted - true)
+    record = {"config": config, "name": config_name(config), "status": "done", "n_train": int(len(train_rows)),
+              "n_test": int(len(test_rows)), "fit_seconds": fit_seconds,
+              "predict_ms_per_1000": 1e6 * predict_seconds / len(test_rows), "model_bytes": folder_size(model_dir),
+              "max_depth_reached": predictor.meta["max_depth"]}
+    accuracy = []
+    for k, target in enumerate(TARGETS):
+        record[target + "_mae"] = float(error[:, k].mean())
+        record[target + "_rmse"] = float(np.sqrt((error[:, k] ** 2).mean()))
+        record[target + "_vs_T"] = binned_error(true[:, k], error[:, k], n_bins)
+        # 1 - MAE relative to the spread of the target: 1 is perfect, 0 is as bad as predicting the mean
+        accuracy.append(1. - error[:, k].mean() / np.abs(true[:, k] - true[:, k].mean()).mean())
+    record["accuracy"] = float(np.mean(accuracy))
+    record["accuracy_per_ms"] = record["accuracy"] / max(record["predict_ms_per_1000"] / 1000., 1e-12)
+    if not keep_model:
+        shutil.rmtree(model_dir, ignore_errors=True)
+    with open(os.path.join(out_dir, record["name"] + ".json"), 'w') as f:
+        json.dump(record, f, indent=1)
+    return record
+
+
+def _run_worker(args):
+    try:
+        evaluate_config(*args)
+    except MemoryError:
+        _write_status(args[2], args[1], "memory error")
+    except Exception as e:
+        _write_status(args[2], args[1], "failed: " + repr(e))
+
+
+def _write_status(out_dir, config, status):
+    # a failed or killed worker may leave a partially exported model
+    shutil.rmtree(os.path.join(out_dir, "models", config_name(config)), ignore_errors=True)
+    with open(os.path.join(out_dir, config_name(config) + ".json"), 'w') as f:
+        json.dump({"config": config, "name": config_name(config), "status": status}, f, indent=1)
+
+
+def _read_status(out_dir, config):
+    path = os.path.join(out_dir, config_name(config) + ".json")
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f).get("status")
+
+
+def run_sweep(store_path, configs, out_dir, jobs = 2, timeout = 3600., poll_interval = 0.5, **kwargs):
+    """
+        Evaluates configurations in at most jobs processes at once; a configuration running longer than timeout is killed
+        and recorded with status "timeout". Finished configurations (status "done") are not trained again, timed out,
+        failed and unfinished ones are retried.
+        @param string store_path: TrainingDataStore folder
+        @param list configs: list of RandomForestRegressor parameter dicts (see grid_configs)
+        @param string out_dir: sweep folder
+        @param int jobs: number of simultaneously trained configurations (default 2); memory ~ jobs * max_train_rows * n_channels * 4 bytes + models
+        @param float timeout: time limit of one configuration in s (default 3600)
+        @param float poll_interval: pause between checks of workers in s (default 0.5)
+        @param kwargs: other parameters of evaluate_config (max_train_rows, test_fraction, seed, threads, n_bins, keep_model)
+
+        @return list of dict records, ranked (see rank)
+    """
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    params = [kwargs.get(k, d) for k, d in (("max_train_rows", 200000), ("test_fraction", 0.2), ("seed", 0),
+                                                ("threads", 1), ("n_bins", 10), ("keep_model", False))]
+    waiting = [c for c in configs if _read_status(out_dir, c) != "done"]
+    for config in waiting:
+        # status of the previous attempt must not be taken for the result of this one
+        path = os.path.join(out_dir, config_name(config) + ".json")
+        if os.path.exists(path):
+            os.remove(path)
+    running = []
+    while waiting or running:
+        while waiting and len(running) < jobs:
+            config = waiting.pop(0)
+            process = multiprocessing.Process(target=_run_worker, args=((store_path, config, out_dir) + tuple(params),))
+            process.start()
+            running.append((process, config, time.time()))
+        time.sleep(poll_interval)
+        still = []
+        for process, config, started in running:
+            if process.is_alive() and time.time() - started > timeout:
+                process.terminate()
+                process.join()
+                _write_status(out_dir, config, "timeout")
+            elif process.is_alive():
+                still.append((process, config, started))
+            else:
+                process.join()
+                if not os.path.exists(os.path.join(out_dir, config_name(config) + ".json")):
+                    _write_status(out_dir, config, "died with exit code %s" % process.exitcode)
+        running = still
+    return rank(read_results(out_dir, configs))
+
+
+def read_results(out_dir, configs):
+    records = []
+    for config in configs:
+        path = os.path.join(out_dir, config_name(config) + ".json")
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                records.append(json.load(f))
+    return records
+
+
+def _dominates(a, b):
+    no_worse = (a["accuracy"] >= b["accuracy"] and a["predict_ms_per_1000"] <= b["predict_ms_per_1000"]
+                and a["model_bytes"] <= b["model_bytes"])
+    better = (a["accuracy"] > b["accuracy"] or a["predict_ms_per_1000"] < b["predict_ms_per_1000"]
+              or a["model_bytes"] < b["model_bytes"])
+    return no_worse and better
+
+
+def rank(records):
+    """
+        Sorts finished configurations by accuracy per millisecond of inference (per 1000 spectra) and marks pareto optimal ones:
+        no other configuration is at least as accurate, fast and small and better in one of them
+        @param list records: records of evaluate_config
+
+        @return list of records, finished first
+    """
+    done = [r for r in records if r.get("status") == "done"]
+    for r in done:
+        r["pareto"] = not any(_dominates(o, r) for o in done)
+    done.sort(key=lambda r: -r["accuracy_per_ms"])
+    return done + [r for r in records if r.get("status") != "done"]
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep of T_g random forest")
+    parser.add_argument("store", help="TrainingDataStore folder")
+    parser.add_argument("--n-estimators", type=int, nargs="+", default=[20, 50])
+    parser.add_argument("--max-depth", type=int, nargs="+", default=[15, 30])
+    parser.add_argument("--min-samples-leaf", type=int, nargs="+", default=[1])
+    parser.add_argument("--max-features", nargs="+", default=["1.0"], help="fraction of features or 'sqrt'")
+    parser.add_argument("--jobs", type=int, default=2, help="simultaneously trained configurations")
+    parser.add_argument("--threads", type=int, default=1, help="threads of every fit and prediction")
+    parser.add_argument("--timeout", type=float, default=3600., help="time limit of one configuration in s")
+    parser.add_argument("--max-train-rows", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep-models", action="store_true", help="keep exported models in <out>/models")
+    parser.add_argument("--out", default="sweep", help="sweep folder")
+    args = parser.parse_args(argv)
+
+    max_features = [v if v == "sqrt" else float(v) for v in args.max_features]
+    configs = grid_configs({"n_estimators": args.n_estimators, "max_depth": args.max_depth,
+                            "min_samples_leaf": args.min_samples_leaf, "max_features": max_features})
+    records = run_sweep(args.store, configs, args.out, args.jobs, args.timeout, max_train_rows=args.max_train_rows,
+                        seed=args.seed, threads=args.threads, keep_model=args.keep_models)
+    with open(os.path.join(args.out, "results.json"), 'w') as f:
+        json.dump(records, f, indent=1)
+
+    print("%-62s %8s %9s %9s %10s %9s %9s %6s" % ("config", "fit s", "ms/1000", "MB", "accuracy", "Trot MAE", "Tvib MAE", "pareto"))
+    for r in records:
+        if r["status"] != "done":
+            print("%-62s %s" % (r["name"], r["status"]))
+            continue
+        print("%-62s %8.1f %9.2f %9.1f %10.4f %9.1f %9.1f %6s" % (r["name"], r["fit_seconds"], r["predict_ms_per_1000"],
+                                                                  r["model_bytes"] / 2. ** 20, r["accuracy"], r["Trot_mae"],
+                                                                  r["Tvib_mae"], "*" if r["pareto"] else ""))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
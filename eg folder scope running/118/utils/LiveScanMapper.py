@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import time
+import numpy as np
+from collections import deque
+from utils.BalmerTemperature import BalmerTemperature
+
+
+class FileTailer:
+    """
+        Reads complete new lines of a growing text file (file written by scanner or spectrometer during experiment)
+    """
+
+    def __init__(self, file_name):
+        """
+            Constructor
+            @param string file_name: file to follow (may not exist yet)
+
+            @return: no return value
+        """
+        self.file_name = file_name
+        self.offset = 0
+        self.rest = b''
+
+    def read_lines(self, max_bytes = 1 << 22):
+        """
+            Returns lines appended since the previous call; unfinished last line is kept until its end is written
+            @param int max_bytes: maximal number of bytes read at once (bounds memory, default 4MB)
+
+            @return list of strings
+        """
+        if not os.path.exists(self.file_name):
+            return []
+        with open(self.file_name, 'rb') as f:
+            f.seek(self.offset)
+            block = f.read(max_bytes)
+        self.offset += len(block)
+        block = self.rest + block
+        end = block.rfind(b'\n') + 1
+        self.rest = block[end:]
+        return [line for line in block[:end].decode('utf-8', 'replace').splitlines() if line.strip()]
+
+
+class LiveScanMapper:
+    """
+        Streaming version of notebooks 1, 2, 3a: follows growing scan log ("spec_scan_*.txt") and MPMA file, glues every new spectrum
+        to its raster cell and updates 2D maps (Trot, Tvib, Te, H_a, H_b) while the scan is still running.
+        Memory is bounded by raster size: only the maps, scanner positions and spectra waiting for gluing are kept.
+    """
+
+    def __init__(self, scan_file, mpma_file, standardizator, predictor = None, time_offset = 0., n_channels = 1024,
+                 cube = None, channels = slice(5, 45)):
+        """
+            Constructor
+            @param string scan_file: scanner position log being written
+            @param string mpma_file: MPMA file being written
+            @param standardizator: SwanSpectrumStandardizator (its batch get_std_xy_2d is used)
+            @param predictor: object with predict(X) -> (n, 2) [Trot, Tvib], e.g. ForestModel.ForestPredictor or loaded rf (default None - no T_g maps)
+            @param float time_offset: spectrometer to scanner time offset in s (see ScanGluer.base_time_offset and tsync)
+            @param int n_channels: number of spectrometer channels (default 1024)
+            @param cube: optional RasterCube opened for writing, spectra are stored there as well
+            @param channels: standard grid channels used by predictor (default 5:45)
+
+            @return: no return value
+        """
+        self.scan_tail = FileTailer(scan_file)
+        self.mpma_tail = FileTailer(mpma_file)
+        self.standardizator = standardizator
+        self.predictor = predictor
+        self.time_offset = time_offset
+        self.n_channels = n_channels
+        self.cube = cube
+        self.channels = channels
+        self.balmer = BalmerTemperature()
+
+        self.scan_header = []
+        self.resolution = None
+        self.pos_x, self.pos_y, self.pos_time = [], [], []
+        self.start_time = None
+        self.wavelength = None
+        self.pending_time, self.pending_intens = [], []
+        self.maps = {}
+        self.filled = None
+        # seconds of processing per spectrum for recent polls
+        self.latency = deque(maxlen=1000)
+
+    def _parse_scan_lines(self, lines):
+        for line in lines:
+            if len(self.scan_header) < 3:
+                self.scan_header.append(line)
+                if len(self.scan_header) == 2:
+                    self.resolution = tuple(int(v) for v in line.split()[:2])
+                    self.filled = np.zeros(self.resolution, dtype=bool)
+                    for name in ("Trot", "Tvib", "Te", "H_a", "H_b"):
+                        self.maps[name] = np.full(self.resolution, np.nan)
+                continue
+            i, j, hms = line.split()[:3]
+            h, m, s = hms.split(':')
+            t = int(h) * 3600. + int(m) * 60. + float(s)
+            if self.start_time is None:
+                self.start_time = t
+            t -= self.start_time
+            if self.pos_time and t < self.pos_time[-1] - 43200.:
+                t += 86400.
+            self.pos_x.append(int(i))
+            self.pos_y.append(int(j))
+            self.pos_time.append(t)
+
+    def _parse_mpma_lines(self, lines):
+        for line in lines:
+            cells = line.replace(',', '.').split('\t')
+            if self.wavelength is None:
+                self.wavelength = np.array(cells[1:self.n_channels + 1], dtype='float64')
+                continue
+            self.pending_time.append(float(cells[0]) + self.time_offset)
+            self.pending_intens.append(np.array(cells[1:self.n_channels + 1], dtype='float64'))
+
+    def _glue_pending(self, final = False):
+        """
+            Glues waiting spectra whose scanner position is known: the spectrum is older than the last logged position
+            (or all of them when the scan is finished)
+        """
+        if not self.pending_time or not self.pos_time:
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64'), np.empty((0, self.n_channels))
+        t = np.array(self.pending_time)
+        ready = np.ones(len(t), dtype=bool) if final else t < self.pos_time[-1]
+        pos = np.searchsorted(np.array(self.pos_time), t[ready], side='right') - 1
+        intens = np.array([row for row, r in zip(self.pending_intens, ready) if r])
+        self.pending_time = [v for v, r in zip(self.pending_time, ready) if not r]
+        self.pending_intens = [v for v, r in zip(self.pending_intens, ready) if not r]
+        # spectra before the scan start are thrown away
+        inside = pos >= 0
+        x, y = np.array(self.pos_x)[pos[inside]], np.array(self.pos_y)[pos[inside]]
+        intens = intens[inside]
+        # the first spectrum of every cell is kept (as drop_duplicates(keep="first") in notebook 2)
+        keep = ~self.filled[x, y]
+        cell = x * self.resolution[1] + y
+        _, first = np.unique(cell, return_index=True)
+        once = np.zeros(len(cell), dtype=bool)
+        once[first] = True
+        keep &= once
+        return x[keep], y[keep], intens[keep]
+
+    def update(self, final = False):
+        """
+            One polling step: reads new lines of both files, glues ready spectra and updates maps
+            @param Boolean final: glue all waiting spectra (scan is finished)
+
+            @return int : number of new pixels
+        """
+        self._parse_scan_lines(self.scan_tail.read_lines())
+        self._parse_mpma_lines(self.mpma_tail.read_lines())
+        if self.resolution is None or self.wavelength is None:
+            return 0
+        started = time.time()
+        x, y, intens = self._glue_pending(final)
+        if len(x) == 0:
+            return 0
+        self.filled[x, y] = True
+        if self.cube is not None:
+            self.cube.write_spectra(x, y, intens)
+
+        te, r2, n_used, line_intens = self.balmer.electron_temperature(10 * self.wavelength, intens)
+        self.maps["Te"][x, y] = te
+        self.maps["H_a"][x, y] = line_intens[:, 0]
+        self.maps["H_b"][x, y] = line_intens[:, 1]
+
+        if self.predictor is not None:
+            x_std, y_std = self.standardizator.get_std_xy_2d(self.wavelength, intens)
+            features = y_std[:, self.channels]
+            features[np.isnan(features)] = 0
+            t_predict = self.predictor.predict(features)
+            self.maps["Trot"][x, y] = t_predict[:, 0]
+            self.maps["Tvib"][x, y] = t_predict[:, 1]
+        self.latency.append((time.time() - started) / len(x))
+        return len(x)
+
+    def is_scan_finished(self):
+        """
+            @return Boolean : scanner logged the last raster cell
+        """
+        return self.resolution is not None and len(self.pos_time) >= self.resolution[0] * self.resolution[1]
+
+    def run(self, poll_interval = 0.1, idle_timeout = 10., callback = None):
+        """
+            Follows both files until the scan is finished and no new spectra arrive for idle_timeout seconds
+            @param float poll_interval: pause between polls in s (default 0.1, well under ~0.52s scan step)
+            @param float idle_timeout: stop after this time without new data once the scan is finished (default 10s)
+            @param callback: function(mapper, n_new) called after every poll with new pixels, e.g. to redraw imshow of mapper.maps
+
+            @return dict : maps, 2D np.arrays (nx, ny), NaN for cells not scanned yet
+        """
+        last_data = time.time()
+        while True:
+            n_new = self.update()
+            if n_new:
+                last_data = time.time()
+                if callback is not None:
+                    callback(self, n_new)
+            elif self.is_scan_finished() and time.time() - last_data > idle_timeout:
+                break
+            time.sleep(poll_interval)
+        n_new = self.update(final=True)
+        if n_new and callback is not None:
+            callback(self, n_new)
+        return self.maps
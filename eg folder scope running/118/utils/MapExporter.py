@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+
+Export of 2D maps of a RasterCube, e.g. all 1024 channel maps and all layers of a scan:
+    python -m utils.MapExporter batch/118_13_18/cube --out img --suffix __118_13_18_ --jobs 4
+"""
+
+import os
+import sys
+import json
+import argparse
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.RasterCube import RasterCube
+
+# colour maps and ranges used by notebooks 2 and 3a
+LAYER_STYLE = {
+    "Te": ("RdBu_r", (0., 1.), "Electron temperature, eV"),
+    "H_a": ("RdBu_r", None, "$H_{alpha}$, a.u."),
+    "H_b": ("RdBu_r", None, "$H_{beta}$, a.u."),
+    "Trot": ("YlOrRd", (1000., 3000.), "$C_2$ temperature $T_{rot}$, K"),
+    "Tvib": ("YlOrRd", (2000., 3000.), "$C_2$ temperature $T_{vib}$, K"),
+}
+LAYER_FILE_NAMES = {"H_a": "Halpha", "H_b": "Hbeta"}
+CHANNEL_STYLE = ("RdBu", None)
+
+
+def colormap_lut(cmap, n = 256):
+    """
+        @param string cmap: matplotlib colour map name
+        @param int n: number of colours
+
+        @return np.array (n, 4) uint8 RGBA look-up table
+    """
+    try:
+        from matplotlib import colormaps
+        colours = colormaps[cmap]
+    except ImportError:
+        from matplotlib import cm
+        colours = cm.get_cmap(cmap)
+    return (255 * colours(np.linspace(0., 1., n))).round().astype('uint8')
+
+
+def value_range(z, mask, vmin = None, vmax = None):
+    """
+        Colour range of a map, by default min and max of absolute values of covered cells (as abs(Z).min(), abs(Z).max()
+        in notebook 2)
+
+        @return (vmin, vmax)
+    """
+    valid = np.abs(z[mask & np.isfinite(z)])
+    if vmin is None:
+        vmin = float(valid.min()) if valid.size else 0.
+    if vmax is None:
+        vmax = float(valid.max()) if valid.size else 1.
+    return vmin, vmax
+
+
+def render_png(file_name, z, mask, cmap = "RdBu_r", vmin = None, vmax = None, scale = 4, lut = None):
+    """
+        Fast path: writes the map as PNG image directly (colour look-up table + pixel repetition), no matplotlib figure is built.
+        Orientation is the same as imshow(Z, origin="lower"): cell (0, 0) is at the bottom left.
+        Cells without data are transparent.
+        @param string file_name: output .png
+        @param z: 2D np.array (nx, ny)
+        @param mask: 2D boolean np.array, True for cells with data
+        @param string cmap: matplotlib colour map name (default 'RdBu_r')
+        @param float vmin, vmax: colour range (default - see value_range)
+        @param int scale: every cell becomes scale x scale image pixels (default 4)
+        @param lut: optional look-up table of colormap_lut (avoids rebuilding it for every map)
+
+        @return (vmin, vmax)
+    """
+    from matplotlib import image
+    lut = colormap_lut(cmap) if lut is None else lut
+    vmin, vmax = value_range(z, mask, vmin, vmax)
+    index = np.nan_to_num((z - vmin) / ((vmax - vmin) or 1.) * (len(lut) - 1))
+    rgba = lut[np.clip(index, 0, len(lut) - 1).astype('int64')]
+    rgba[~(mask & np.isfinite(z))] = 0
+    rgba = rgba[::-1]
+    if scale > 1:
+        rgba = np.repeat(np.repeat(rgba, scale, axis=0), scale, axis=1)
+    image.imsave(file_name, rgba)
+    return vmin, vmax
+
+
+def render_figure(file_names, z, mask, cmap = "RdBu_r", vmin = None, vmax = None, title = None, dpi = 300):
+    """
+        Full matplotlib figure as in notebooks (imshow with bilinear interpolation, colour bar, title); Agg canvas is used
+        without pyplot, so it is safe in worker processes
+        @param file_names: list of output files (e.g. .svg and .png)
+        (other parameters - see render_png)
+
+        @return (vmin, vmax)
+    """
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    vmin, vmax = value_range(z, mask, vmin, vmax)
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    im = ax.imshow(np.ma.masked_array(z, ~(mask & np.isfinite(z))), cmap=cmap, vmin=vmin, vmax=vmax, origin="lower",
+                   interpolation='bilinear')
+    fig.colorbar(im)
+    if title:
+        ax.set_title(title)
+    for file_name in file_names:
+        fig.savefig(file_name, dpi=dpi)
+    return vmin, vmax
+
+
+def _export_task(args):
+    # top-level function - it is pickled and sent to worker processes
+    cube_path, kind, keys, out_dir, suffix, fast, scale, formats = args
+    cube = RasterCube(cube_path).open()
+    mask = cube.mask
+    entries = []
+    if kind == "channels":
+        cmap, limits = CHANNEL_STYLE
+        # one contiguous block of Fortran ordered planes
+        block = np.asarray(cube.intens[:, :, keys[0]:keys[-1] + 1], dtype='float64')
+        maps = [("wl%.1fA" % cube.wavelength[k], block[:, :, k - keys[0]], cmap, limits, "Chosen_wl = %.1fA" % cube.wavelength[k])
+                for k in keys]
+    else:
+        maps = []
+        for name in keys:
+            cmap, limits, title = LAYER_STYLE.get(name, ("RdBu_r", None, name))
+            maps.append((LAYER_FILE_NAMES.get(name, name), np.asarray(cube.layer(name)), cmap, limits, title))
+    lut = {}
+    for base, z, cmap, limits, title in maps:
+        vmin, vmax = limits if limits is not None else (None, None)
+        base = os.path.join(out_dir, base + suffix)
+        if fast:
+            if cmap not in lut:
+                lut[cmap] = colormap_lut(cmap)
+            files = [base + ".png"]
+            vmin, vmax = render_png(files[0], z, mask, cmap, vmin, vmax, scale, lut[cmap])
+        else:
+            files = [base + "." + f for f in formats]
+            vmin, vmax = render_figure(files, z, mask, cmap, vmin, vmax, title)
+        entries.append({"map": title, "files": [os.path.basename(f) for f in files], "vmin": vmin, "vmax": vmax})
+    return entries
+
+
+class MapExporter:
+    """
+        Batch export of wavelength channel maps and derived layers (Te, H_a, H_b, Trot, Tvib, ...) of a RasterCube.
+        Pixels are taken from cube coordinates and coverage mask, maps are rendered by worker processes which open the cube
+        by memory mapping (every worker reads only its own contiguous block of channel planes).
+        index.json in the output folder lists all maps with their files and colour ranges.
+    """
+
+    def __init__(self, cube_path, out_dir = "img", suffix = "", fast = True, scale = 4, formats = ("svg", "png")):
+        """
+            Constructor
+            @param string cube_path: RasterCube folder
+            @param string out_dir: output folder (default 'img' as notebooks)
+            @param string suffix: file name suffix, e.g. my_fname (default '')
+            @param Boolean fast: direct PNG writing (True) or full matplotlib figures with colour bar (default True)
+            @param int scale: image pixels per raster cell of fast path (default 4)
+            @param formats: formats of full figures (default svg and png as notebooks)
+
+            @return: no return value
+        """
+        self.cube_path = cube_path
+        self.out_dir = out_dir
+        self.suffix = suffix
+        self.fast = fast
+        self.scale = scale
+        self.formats = formats
+
+    def export(self, wavelengths = None, layers = None, jobs = None, channels_per_task = 64):
+        """
+            Renders maps
+            @param wavelengths: list of wavelengths in A (closest channels are taken), 'all' for all channels
+                or None for no channel maps (default None)
+            @param layers: list of layer names, 'all' for all layers of the cube or None for no layers (default None)
+            @param int jobs: number of worker processes (default - number of CPUs, 1 - in this process)
+            @param int channels_per_task: channels rendered by one task (default 64)
+
+            @return list of dicts (map, files, vmin, vmax)
+        """
+        if not os.path.exists(self.out_dir):
+            os.makedirs(self.out_dir)
+        cube = RasterCube(self.cube_path).open()
+        if wavelengths is None:
+            channels = []
+        elif wavelengths == 'all':
+            channels = list(range(cube.shape[2]))
+        else:
+            channels = sorted(set(cube.channel_index(wl) for wl in wavelengths))
+        if layers == 'all':
+            layers = cube.layers
+        common = (self.out_dir, self.suffix, self.fast, self.scale, tuple(self.formats))
+        tasks = []
+        # a task takes neighbouring channels only, so that it reads one contiguous block
+        group = []
+        for k in channels:
+            if group and (k - group[0] >= channels_per_task):
+                tasks.append((self.cube_path, "channels", group) + common)
+                group = []
+            group.append(k)
+        if group:
+            tasks.append((self.cube_path, "channels", group) + common)
+        for name in layers or []:
+            tasks.append((self.cube_path, "layers", [name]) + common)
+
+        if jobs == 1:
+            results = list(map(_export_task, tasks))
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                results = list(executor.map(_export_task, tasks))
+        entries = [entry for result in results for entry in result]
+        with open(os.path.join(self.out_dir, "index%s.json" % self.suffix), 'w') as f:
+            json.dump(entries, f, indent=1)
+        return entries
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description="Export of 2D maps of a raster cube")
+    parser.add_argument("cube", help="RasterCube folder")
+    parser.add_argument("--out", default="img", help="output folder")
+    parser.add_argument("--suffix", default="", help="file name suffix (my_fname)")
+    parser.add_argument("--wavelengths", nargs="*", default=["all"], help="wavelengths in A or 'all'")
+    parser.add_argument("--layers", nargs="*", default=["all"], help="layer names or 'all'")
+    parser.add_argument("--figures", action="store_true", help="full matplotlib figures (svg, png) instead of direct PNG")
+    parser.add_argument("--scale", type=int, default=4, help="image pixels per raster cell of direct PNG")
+    parser.add_argument("--jobs", type=int, default=None, help="number of worker processes")
+    args = parser.parse_args(argv)
+
+    wavelengths = 'all' if args.wavelengths == ["all"] else ([float(v) for v in args.wavelengths] or None)
+    layers = 'all' if args.layers == ["all"] else (args.layers or None)
+    entries = MapExporter(args.cube, args.out, args.suffix, not args.figures, args.scale).export(wavelengths, layers, args.jobs)
+    print("%d maps written to %s" % (len(entries), args.out))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import numpy as np
+
+
+class RasterCube:
+    """
+        On-disk raster spectral cube (replacement of the "xy_wl*.pkl" -> "xy_NoDuble_wl_HaHb_Te*.pkl" -> "..._Tg*.pkl" chain).
+        Cube is a folder of .npy files opened by memory mapping:
+            intens.npy - (nx, ny, n_wavelengths) intensities in Fortran order, i.e. every wavelength plane [:, :, k] is contiguous
+                         and reading one wavelength map touches only nx*ny values
+            wavelength.npy - (n_wavelengths,) wavelength axis in A
+            mask.npy - (nx, ny) coverage mask, True for cells which have a spectrum (other cells of intens are 0)
+            layer_<name>.npy - (nx, ny) derived per-pixel layers (H_a, H_b, Te, Trot, Tvib, ...)
+            meta.json - shape, dtype and list of layers
+        Adding a layer writes only its own file.
+    """
+
+    def __init__(self, path):
+        """
+            Constructor, does not touch the disk (see create and open)
+            @param string path: cube folder
+
+            @return: no return value
+        """
+        self.path = path
+        self.meta = None
+        self.mode = 'r'
+        self.intens = self.wavelength = self.mask = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".npy")
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), 'w') as f:
+            json.dump(self.meta, f)
+
+    def create(self, wavelength, nx, ny, dtype = 'float32'):
+        """
+            Creates empty cube (all cells masked)
+            @param wavelength: np.array of wavelength in A
+            @param int nx, ny: raster size (e.g. 56, 100 from the second line of scan log)
+            @param dtype: intensity dtype (default 'float32')
+
+            @return self
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        wavelength = np.asarray(wavelength, dtype='float64')
+        np.save(self._file("wavelength"), wavelength)
+        np.save(self._file("mask"), np.zeros((nx, ny), dtype=bool))
+        intens = np.lib.format.open_memmap(self._file("intens"), mode='w+', dtype=dtype,
+                                           shape=(nx, ny, len(wavelength)), fortran_order=True)
+        del intens
+        self.meta = {"shape": [nx, ny, len(wavelength)], "dtype": np.dtype(dtype).str, "layers": []}
+        self._write_meta()
+        return self.open(mode='r+')
+
+    def open(self, mode = 'r'):
+        """
+            Opens existing cube by memory mapping
+            @param string mode: 'r' - read only, 'r+' - writable (default 'r')
+
+            @return self
+        """
+        with open(os.path.join(self.path, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        self.intens = np.load(self._file("intens"), mmap_mode=mode)
+        self.wavelength = np.load(self._file("wavelength"))
+        self.mask = np.load(self._file("mask"))
+        self.mode = mode
+        return self
+
+    def close(self):
+        """
+            Flushes and releases memory mapped intensities
+
+            @return: no return value
+        """
+        if self.intens is not None and self.mode != 'r':
+            self.intens.flush()
+        self.intens = None
+
+    @property
+    def shape(self):
+        return tuple(self.meta["shape"])
+
+    @property
+    def layers(self):
+        return list(self.meta["layers"])
+
+    def write_spectra(self, x, y, intens):
+        """
+            Puts spectra into their raster cells and marks cells as covered
+            @param x, y: np.arrays of integer raster coordinates of spectra (e.g. from ScanGluer.glue_xy)
+            @param intens: 2D np.array (n_spectra, n_wavelengths) of intensities
+
+            @return: no return value
+        """
+        x, y = np.asarray(x, dtype='int64'), np.asarray(y, dtype='int64')
+        self.intens[x, y, :] = intens
+        self.mask[x, y] = True
+        np.save(self._file("mask"), self.mask)
+
+    def channel_index(self, wl):
+        """
+            Index of channel closest to given wavelength
+            @param float wl: wavelength in A
+
+            @return int
+        """
+        return int(np.argmin(np.abs(self.wavelength - wl)))
+
+    def wavelength_map(self, wl, fill = np.nan):
+        """
+            Reads 2D map of one wavelength channel (only this plane is read from disk)
+            @param float wl: wavelength in A (closest channel is taken)
+            @param float fill: value for uncovered cells (default NaN)
+
+            @return 2D np.array (nx, ny)
+        """
+        z = np.array(self.intens[:, :, self.channel_index(wl)], dtype='float64')
+        z[~self.mask] = fill
+        return z
+
+    def band(self, wl_min, wl_max):
+        """
+            Memory mapped sub-cube of wavelength channels inside [wl_min, wl_max] (contiguous on disk)
+            @param float wl_min, wl_max: band boundaries in A
+
+            @return (wavelength, intens) : np.array of band wavelength and (nx, ny, n_band) view of intensities,
+                n_band = 0 if no channel is inside the band
+        """
+        k = np.flatnonzero((self.wavelength >= wl_min) & (self.wavelength <= wl_max))
+        if len(k) == 0:
+            return self.wavelength[:0], self.intens[:, :, :0]
+        return self.wavelength[k[0]:k[-1] + 1], self.intens[:, :, k[0]:k[-1] + 1]
+
+    def pixel_spectra(self, wl_min = None, wl_max = None):
+        """
+            Covered cells as a spectra matrix, the form used by SpectrumModifier/SwanSpectrumStandardizator batch methods
+            @param float wl_min, wl_max: optional band boundaries in A (default - all channels)
+
+            @return (x, y, wavelength, intens) : coordinates of covered cells, wavelength, (n_covered, n_band) intensities
+        """
+        if wl_min is None:
+            wavelength, cube = self.wavelength, self.intens
+        else:
+            wavelength, cube = self.band(wl_min, wl_max)
+        x, y = np.nonzero(self.mask)
+        return x, y, wavelength, np.asarray(cube[x, y, :])
+
+    def add_layer(self, name, values, x = None, y = None):
+        """
+            Writes derived per-pixel layer (e.g. 'Te', 'Trot'); cube itself is not rewritten
+            @param string name: layer name
+            @param values: 2D np.array (nx, ny), or 1D np.array of values for cells (x, y)
+            @param x, y: np.arrays of raster coordinates if values is 1D
+
+            @return: no return value
+        """
+        if x is None:
+            layer = np.asarray(values, dtype='float64')
+        else:
+            layer = np.full(self.shape[:2], np.nan)
+            layer[np.asarray(x, dtype='int64'), np.asarray(y, dtype='int64')] = values
+        np.save(self._file("layer_" + name), layer)
+        if name not in self.meta["layers"]:
+            self.meta["layers"].append(name)
+            self._write_meta()
+
+    def layer(self, name, mmap = True):
+        """
+            Reads derived layer
+            @param string name: layer name
+            @param Boolean mmap: open as memory map (default True)
+
+            @return 2D np.array (nx, ny), NaN for cells without value
+        """
+        if name not in self.meta["layers"]:
+            raise KeyError("No layer '" + name + "' in " + self.path)
+        return np.load(self._file("layer_" + name), mmap_mode='r' if mmap else None)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+
+
+class ResultCache:
+    """
+        Content-addressed disk cache of intermediate results. Key is a hash of input bytes (files or arrays), stage name and
+        stage parameters, so changing e.g. a plot parameter downstream does not recompute reading/gluing/standardization.
+        Every entry is a folder <cache_dir>/<key[:2]>/<key> with results as .npy files; entries are evicted in LRU order
+        (modification time of the entry folder is updated on every hit) when the total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir = "cache", max_bytes = 10 * 2 ** 30):
+        """
+            Constructor
+            @param string cache_dir: cache folder (default 'cache')
+            @param int max_bytes: size cap in bytes (default 10GB)
+
+            @return: no return value
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # file content hashes are remembered by (path, size, mtime) to avoid rereading unchanged raw files
+        self._file_hashes = {}
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def hash_file(self, file_name, block_size = 1 << 24):
+        """
+            sha1 of file content
+            @param string file_name: file
+
+            @return string : hex digest
+        """
+        st = os.stat(file_name)
+        memo_key = (os.path.abspath(file_name), st.st_size, st.st_mtime_ns)
+        if memo_key not in self._file_hashes:
+            h = hashlib.sha1()
+            with open(file_name, 'rb') as f:
+                block = f.read(block_size)
+                while block:
+                    h.update(block)
+                    block = f.read(block_size)
+            self._file_hashes[memo_key] = h.hexdigest()
+        return self._file_hashes[memo_key]
+
+    def hash_array(self, arr):
+        """
+            sha1 of array dtype, shape and bytes
+            @param arr: np.array
+
+            @return string : hex digest
+        """
+        arr = np.ascontiguousarray(arr)
+        h = hashlib.sha1((arr.dtype.str + str(arr.shape)).encode('utf-8'))
+        h.update(arr.data if arr.size else b'')
+        return h.hexdigest()
+
+    def key(self, stage, params, inputs = ()):
+        """
+            Cache key of a stage call
+            @param string stage: stage name (e.g. 'read', 'glue', 'standardize', 'predict')
+            @param dict params: json-serializable stage parameters
+            @param inputs: sequence of file names (str) and np.arrays
+
+            @return string : hex digest
+        """
+        parts = [stage, json.dumps(params, sort_keys=True)]
+        for item in inputs:
+            parts.append(self.hash_file(item) if isinstance(item, str) else self.hash_array(item))
+        return hashlib.sha1("|".join(parts).encode('utf-8')).hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """
+            Cached results or None
+            @param string key: cache key
+
+            @return tuple of np.arrays or None; arrays are memory mapped copy-on-write, i.e. writable as computed results,
+                changes stay in memory and never reach the cache
+        """
+        entry = self._entry_dir(key)
+        meta_file = os.path.join(entry, "meta.json")
+        if not os.path.exists(meta_file):
+            return None
+        with open(meta_file, 'r') as f:
+            meta = json.load(f)
+        os.utime(entry, None)
+        result = []
+        for i in range(meta["n_items"]):
+            arr = np.load(os.path.join(entry, "item%d.npy" % i), mmap_mode='c')
+            result.append(arr[()] if arr.ndim == 0 else arr)
+        return tuple(result)
+
+    def put(self, key, stage, result):
+        """
+            Stores results and evicts least recently used entries above size cap
+            @param string key: cache key
+            @param string stage: stage name (stored for information)
+            @param result: tuple of np.arrays / numbers
+
+            @return: no return value
+        """
+        entry = self._entry_dir(key)
+        tmp = entry + ".tmp%d" % os.getpid()
+        os.makedirs(tmp)
+        size = 0
+        for i, item in enumerate(result):
+            path = os.path.join(tmp, "item%d.npy" % i)
+            np.save(path, np.asarray(item))
+            size += os.path.getsize(path)
+        with open(os.path.join(tmp, "meta.json"), 'w') as f:
+            json.dump({"stage": stage, "n_items": len(result), "bytes": size, "created": time.time()}, f)
+        if os.path.exists(entry):
+            shutil.rmtree(tmp)
+        else:
+            os.rename(tmp, entry)
+        self.evict()
+
+    def entries(self):
+        """
+            @return list of (last use time, bytes, entry folder) of all cache entries
+        """
+        result = []
+        for sub in os.listdir(self.cache_dir):
+            sub_dir = os.path.join(self.cache_dir, sub)
+            if not os.path.isdir(sub_dir):
+                continue
+            for name in os.listdir(sub_dir):
+                entry = os.path.join(sub_dir, name)
+                meta_file = os.path.join(entry, "meta.json")
+                if os.path.exists(meta_file):
+                    with open(meta_file, 'r') as f:
+                        size = json.load(f)["bytes"]
+                    result.append((os.stat(entry).st_mtime, size, entry))
+        return result
+
+    def evict(self):
+        """
+            Removes least recently used entries until total size is below max_bytes
+
+            @return int : number of removed entries
+        """
+        entries = sorted(self.entries())
+        total = sum(size for used, size, entry in entries)
+        removed = 0
+        for used, size, entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+            removed += 1
+        return removed
+
+    def cached(self, stage, params, inputs, func):
+        """
+            Returns cached results of func() or computes and stores them
+            @param string stage: stage name
+            @param dict params: json-serializable stage parameters (part of the key)
+            @param inputs: sequence of file names and np.arrays (their content is part of the key)
+            @param func: function without arguments returning tuple of np.arrays
+
+            @return tuple of np.arrays
+        """
+        key = self.key(stage, params, inputs)
+        result = self.get(key)
+        if result is None:
+            result = tuple(func())
+            self.put(key, stage, result)
+        return result
+
+
+class CachedPipeline:
+    """
+        Reader, gluing, Swan standardization and prediction stages wrapped by ResultCache, e.g. in a notebook:
+            pipeline = CachedPipeline(ResultCache("cache", 20 * 2**30))
+            t, wl, intens = pipeline.read_mpma(raw_Mal)
+            pos = pipeline.glue(raw_Kud, t, time_offset)
+            x_std, y_std = pipeline.standardize(wl, intens[keep])
+            T_predict = pipeline.predict(predictor, "forest40chMOSTandNoise3add_estim50_dep50T1540915567", features)
+        Changing only CHOSEN_WL or a colour range reruns nothing of this, changing tsync reruns gluing and what follows.
+    """
+
+    def __init__(self, cache):
+        """
+            Constructor
+            @param cache: ResultCache
+
+            @return: no return value
+        """
+        self.cache = cache
+
+    def read_mpma(self, mpma_file, n_channels = 1024, dtype = 'float32'):
+        from utils.SpectrumReader import SpectrumReader
+        return self.cache.cached("read_mpma", {"n_channels": n_channels, "dtype": dtype}, [mpma_file],
+                                 lambda: SpectrumReader().read_mpma_spectra(mpma_file, n_channels, dtype=dtype))
+
+    def glue(self, scan_file, spec_time, time_offset, tsync_step = 0.25):
+        from utils.ScanGluer import ScanGluer
+        return self.cache.cached("glue", {"time_offset": float(time_offset), "tsync_step": tsync_step}, [scan_file, spec_time],
+                                 lambda: (ScanGluer(scan_file, tsync_step).glue(spec_time, time_offset),))[0]
+
+    def standardize(self, x_exp, y2d_exp, mask_bounds = (5033., 5220.), grid = (5036., 5200., 50), expected_max = 5165.2,
+                    alignment = 'integer'):
+        from utils.SwanSpectrumStandardizator import SwanSpectrumStandardizator
+        params = {"mask_bounds": list(mask_bounds), "grid": list(grid), "expected_max": expected_max, "alignment": alignment}
+        return self.cache.cached("standardize", params, [x_exp, y2d_exp],
+                                 lambda: SwanSpectrumStandardizator().get_std_xy_2d(x_exp, y2d_exp, mask_bounds, grid, expected_max,
+                                                                                    alignment))
+
+    def predict(self, predictor, model_id, features):
+        return self.cache.cached("predict", {"model": model_id}, [features], lambda: (predictor.predict(features),))[0]
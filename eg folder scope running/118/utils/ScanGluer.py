@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import re
+import numpy as np
+import pandas as pd
+
+
+class ScanGluer:
+    """
+        Gluing of the scanner position log ("spec_scan_*.txt", Kudarenko) with the spectrometer stream ("MPMA_*.txt", Hamamatsu).
+        Every spectrum gets raster cell (x, y) of the last scanner position logged before it (the same as outer merge on time + ffill of x, y
+        in "1 UEF_gluing_KudMal"), but only time arrays are joined by binary search - wide spectra frame is never merged or sorted.
+    """
+
+    def __init__(self, scan_file, tsync_step = 0.25):
+        """
+            Constructor
+            @param string scan_file: scanner position log (e.g. 'spec_scan_2019_10_10__13-18-06.txt')
+            @param float tsync_step: time step in s of one tsync unit (default 0.25, see _myconfig.py)
+
+            @return: no return value
+        """
+        self.scan_file = scan_file
+        self.tsync_step = tsync_step
+        self.x, self.y, self.time, self.start_time, self.resolution = self.read_scan_log(scan_file)
+
+    def read_scan_log(self, scan_file):
+        """
+            Reads scanner position log. First line - comment, second - resolution n, m, third - wavelengths,
+            fourth and further - point coordinates i, j and time hh:mm:ss.ffffff
+            @param string scan_file: scanner position log
+
+            @return (x, y, time, start_time, resolution): x, y - np.arrays of raster coordinates,
+                time - np.array of time in s from the first point, start_time - time of the first point in s from midnight,
+                resolution - tuple (n, m) of raster size
+        """
+        with open(scan_file, 'r') as f:
+            f.readline()
+            resolution = tuple(int(v) for v in f.readline().split()[:2])
+        kud_df = pd.read_csv(scan_file, delimiter=" ", skiprows=3, header=None, names=["x", "y", "scan_time"],
+                             dtype={'x': "int64", 'y': "int64", "scan_time": str})
+        t = pd.to_timedelta(kud_df['scan_time']).values / np.timedelta64(1, 's')
+        # scan over midnight
+        t = t + 86400. * np.concatenate(([0], np.cumsum(np.diff(t) < 0)))
+        return kud_df['x'].values, kud_df['y'].values, t - t[0], t[0], resolution
+
+    def base_time_offset(self, mpma_file, rounded = True):
+        """
+            Time offset between spectrometer and scanner clocks from the start time in MPMA file name (e.g. 'MPMA_20191010131801.txt')
+            and the first scanner time, i.e. spectrum time in the scanner clock is t_mpma + base_time_offset
+            @param string mpma_file: MPMA file name
+            @param Boolean rounded: clock difference is rounded down to whole tsync steps as in notebook and _myconfig.py
+                (13-18-07.16 and 13-18-01 -> 6.0, 15-04-56.64 and 15-04-52 -> 4.50), so tsync values tuned by hand there
+                give the same offset here; False - exact difference (default True)
+
+            @return float : offset in s (e.g. 13:18:01 - 13:18:07.156 = -6.0, or -6.156 if not rounded)
+        """
+        hhmmss = re.search(r'MPMA_\d{8}(\d{2})(\d{2})(\d{2})', os.path.basename(mpma_file)).groups()
+        mpma_start = int(hhmmss[0]) * 3600. + int(hhmmss[1]) * 60. + int(hhmmss[2])
+        difference = self.start_time - mpma_start
+        if rounded:
+            # small tolerance against float error of times lying exactly on a step
+            difference = np.floor(difference / self.tsync_step + 1e-9) * self.tsync_step
+        return -float(difference)
+
+    def time_offset(self, base_offset, tsync):
+        """
+            Full time offset as used in notebook: time = t_mpma + base_offset + tsync * tsync_step
+            @param float base_offset: offset from file names (e.g. -6.0)
+            @param tsync: tsync value(s) from _myconfig.py
+
+            @return float or np.array : offset in s
+        """
+        return base_offset + np.asarray(tsync) * self.tsync_step
+
+    def glue(self, spec_time, time_offset = 0.):
+        """
+            Assigns raster cell to every spectrum by sorted search of spectrum time in scanner time
+            @param spec_time: np.array of spectra time in s (first column of MPMA file)
+            @param float time_offset: time offset added to spec_time (see time_offset)
+
+            @return np.array pos : index of scanner log row for every spectrum, -1 for spectra recorded before the scan started
+        """
+        pos = np.searchsorted(self.time, np.asarray(spec_time) + time_offset, side='right') - 1
+        return pos
+
+    def glue_xy(self, spec_time, time_offset = 0.):
+        """
+            Raster coordinates of every spectrum
+            @param spec_time: np.array of spectra time in s (first column of MPMA file)
+            @param float time_offset: time offset added to spec_time
+
+            @return (valid, x, y) : valid - boolean np.array of spectra inside scan, x, y - np.arrays of coordinates for valid spectra
+        """
+        pos = self.glue(spec_time, time_offset)
+        valid = pos >= 0
+        return valid, self.x[pos[valid]], self.y[pos[valid]]
+
+    def cell_index(self, pos):
+        """
+            Flat raster cell index x * m + y of glued spectra
+            @param pos: np.array from glue()
+
+            @return np.array : cell index, -1 for spectra outside scan
+        """
+        cell = self.x[pos] * self.resolution[1] + self.y[pos]
+        cell[pos < 0] = -1
+        return cell
+
+    def first_spectrum_per_cell(self, pos):
+        """
+            Keeps the first spectrum (in time) of every raster cell ("drop_duplicates(subset='x_y', keep='first')" of notebook 2)
+            @param pos: np.array from glue()
+
+            @return np.array : indices of kept spectra, sorted by cell (x, then y)
+        """
+        cell = self.cell_index(pos)
+        order = np.lexsort((np.arange(len(cell)), cell))
+        cell_sorted = cell[order]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = cell_sorted[1:] != cell_sorted[:-1]
+        first &= cell_sorted >= 0
+        return order[first]
+
+    def score_time_offset(self, spec_time, signal, time_offset):
+        """
+            Raster consistency of gluing: within-cell variance of signal plus roughness of the cell mean map along the scan
+            direction (squared differences of consecutive cells of a row).
+            Within-cell variance alone does not see offsets of whole scanner steps: the jump between the end of a row and the start
+            of the next one then falls on a cell boundary inside the row, every cell still holds similar spectra and only the map
+            gets the jump (e.g. row start filled by the previous row end), which the roughness term measures.
+            @param spec_time: np.array of spectra time in s
+            @param signal: np.array (n_spectra,) or (n_spectra, k) of cheap per-spectrum features (e.g. total intensity)
+            @param float time_offset: tested time offset
+
+            @return float : score in units of signal variance (lower is better)
+        """
+        n_cells = self.resolution[0] * self.resolution[1]
+        cell = self.cell_index(self.glue(spec_time, time_offset))
+        valid = cell >= 0
+        cell, s = cell[valid], np.asarray(signal, dtype='float64')[valid]
+        if s.ndim == 1:
+            s = s[:, np.newaxis]
+        s = (s - s.mean(axis=0)) / (s.std(axis=0) + 1e-300)
+        counts = np.bincount(cell, minlength=n_cells).astype('float64')
+        within = roughness = 0.
+        for k in range(s.shape[1]):
+            sums = np.bincount(cell, weights=s[:, k], minlength=n_cells)
+            sums2 = np.bincount(cell, weights=s[:, k] ** 2, minlength=n_cells)
+            within += np.sum(sums2 - sums ** 2 / np.maximum(counts, 1.)) / s.shape[0]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                mean_map = (sums / counts).reshape(self.resolution)
+            step = np.diff(mean_map, axis=1)
+            step = step[np.isfinite(step)]
+            roughness += np.mean(step ** 2) if step.size else np.inf
+        return (within + roughness) / s.shape[1]
+
+    def find_tsync(self, spec_time, signal, base_offset, tsync_candidates = np.arange(-20, 21)):
+        """
+            Chooses tsync automatically by scoring raster consistency of every candidate (instead of manual trial-and-error)
+            @param spec_time: np.array of spectra time in s
+            @param signal: np.array (n_spectra,) or (n_spectra, k), e.g. intens.sum(axis=1)
+            @param float base_offset: offset from file names (see base_time_offset)
+            @param tsync_candidates: tested tsync values (default -20..20)
+
+            @return (best_tsync, scores) : best tsync value and np.array of scores of all candidates
+        """
+        tsync_candidates = np.asarray(tsync_candidates)
+        scores = np.array([self.score_time_offset(spec_time, signal, self.time_offset(base_offset, ts))
+                           for ts in tsync_candidates])
+        return tsync_candidates[np.argmin(scores)], scores
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.SpectrumReader import SpectrumReader
+
+
+def _read_swan_band_file(path):
+    # top-level function - it is pickled and sent to worker processes
+    return SpectrumReader().read_swan_band_with_params(path)
+
+
+class SwanSpectrumLibrary:
+    """
+        Binary library of modeled spectra ("SWAN_band" files from theor_dir).
+        All spectra are parsed once and stored in lib_dir as .npy files which are opened by memory mapping:
+            params.npy  - (n_files, 4) [t_rot, t_vib, i_max, n0] from files headers
+            offsets.npy - (n_files + 1,) start of every spectrum in x.npy, y.npy
+            x.npy, y.npy - concatenated wavelength (A) and intensity of all spectra
+            manifest.json - file names with size/mtime, used to detect changed source files
+    """
+
+    FORMAT_VERSION = 1
+
+    def __init__(self, theor_dir = "modeled spectra", lib_dir = None):
+        """
+            Constructor
+            @param string theor_dir: folder path, where theoretically calculated OES data are stored (default 'modeled spectra')
+            @param string lib_dir: folder path for the binary library (default theor_dir + '.lib')
+
+            @return: no return value
+        """
+        self.theor_dir = theor_dir
+        self.lib_dir = lib_dir if lib_dir is not None else theor_dir.rstrip("/\\") + ".lib"
+        self.files = []
+        self.index = {}
+        self.params = self.offsets = self.x = self.y = None
+
+    def scan_sources(self):
+        """
+            Lists source files of theor_dir with their size and modification time
+
+            @return dict : file name -> [size, mtime_ns]
+        """
+        sources = {}
+        for entry in os.scandir(self.theor_dir):
+            if entry.is_file():
+                st = entry.stat()
+                sources[entry.name] = [st.st_size, st.st_mtime_ns]
+        return sources
+
+    def read_manifest(self):
+        """
+            Reads manifest of existing library
+
+            @return dict or None : manifest, None if library does not exist or has another format
+        """
+        path = os.path.join(self.lib_dir, "manifest.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") != self.FORMAT_VERSION:
+            return None
+        return manifest
+
+    def is_up_to_date(self, sources = None):
+        """
+            Checks that library exists and was built from the same set of unchanged source files
+            @param dict sources: result of scan_sources (scanned if None)
+
+            @return Boolean
+        """
+        manifest = self.read_manifest()
+        if manifest is None:
+            return False
+        if sources is None:
+            sources = self.scan_sources()
+        return manifest["sources"] == sources
+
+    def build(self, n_jobs = None, chunksize = 64):
+        """
+            (Re)builds library. Files unchanged since the previous build are copied from the old library,
+            only new/changed files are parsed (in parallel by worker processes)
+            @param int n_jobs: number of worker processes (default - number of CPUs); 1 - parse in this process
+            @param int chunksize: number of files sent to a worker at once (default 64)
+
+            @return: no return value
+        """
+        sources = self.scan_sources()
+        names = sorted(sources)
+
+        old = {}
+        manifest = self.read_manifest()
+        if manifest is not None:
+            self.open(rebuild=False)
+            for i, name in enumerate(self.files):
+                if manifest["sources"].get(name) == sources.get(name):
+                    a, b = self.offsets[i], self.offsets[i + 1]
+                    old[name] = (np.array(self.params[i]), np.array(self.x[a:b]), np.array(self.y[a:b]))
+            self.close()
+
+        to_parse = [name for name in names if name not in old]
+        paths = [os.path.join(self.theor_dir, name) for name in to_parse]
+        if n_jobs == 1 or len(paths) < 2:
+            parsed = [_read_swan_band_file(path) for path in paths]
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                parsed = list(executor.map(_read_swan_band_file, paths, chunksize=chunksize))
+        old.update(zip(to_parse, parsed))
+
+        if not os.path.exists(self.lib_dir):
+            os.makedirs(self.lib_dir)
+        # manifest is written last, library without it is treated as absent
+        manifest_path = os.path.join(self.lib_dir, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        lengths = np.array([len(old[name][1]) for name in names], dtype='int64')
+        offsets = np.zeros(len(names) + 1, dtype='int64')
+        np.cumsum(lengths, out=offsets[1:])
+        params = np.array([old[name][0] for name in names], dtype='float64').reshape(-1, 4)
+        x = np.concatenate([old[name][1] for name in names]) if names else np.empty(0)
+        y = np.concatenate([old[name][2] for name in names]) if names else np.empty(0)
+        for arr_name, arr in (("params", params), ("offsets", offsets), ("x", x), ("y", y)):
+            np.save(os.path.join(self.lib_dir, arr_name + ".npy"), arr)
+
+        with open(manifest_path, 'w') as f:
+            json.dump({"version": self.FORMAT_VERSION, "files": names, "sources": sources}, f)
+
+    def open(self, rebuild = True, n_jobs = None):
+        """
+            Opens library by memory mapping (no text parsing)
+            @param Boolean rebuild: rebuild library first if source files were changed (default True)
+            @param int n_jobs: number of worker processes for rebuilding
+
+            @return self
+        """
+        if rebuild and os.path.isdir(self.theor_dir) and not self.is_up_to_date():
+            self.build(n_jobs=n_jobs)
+        manifest = self.read_manifest()
+        if manifest is None:
+            raise IOError("No spectrum library in " + self.lib_dir)
+        self.files = manifest["files"]
+        self.index = dict((name, i) for i, name in enumerate(self.files))
+        self.params = np.load(os.path.join(self.lib_dir, "params.npy"), mmap_mode='r')
+        self.offsets = np.load(os.path.join(self.lib_dir, "offsets.npy"))
+        self.x = np.load(os.path.join(self.lib_dir, "x.npy"), mmap_mode='r')
+        self.y = np.load(os.path.join(self.lib_dir, "y.npy"), mmap_mode='r')
+        return self
+
+    def close(self):
+        """
+            Releases memory mapped arrays
+
+            @return: no return value
+        """
+        self.params = self.offsets = self.x = self.y = None
+
+    def __len__(self):
+        return len(self.files)
+
+    def get_spectrum(self, file):
+        """
+            Returns spectrum of source file (the same as SpectrumReader.read_swan_band)
+            @param string file: name of the file in theor_dir, e.g. "Trot1500Tvib3000Default.txt"
+
+            @return np.array (x, y) : x - array of wavelength in A, y - array of intensity in Arb. Units
+        """
+        return self.get_spectrum_by_index(self.index[file])
+
+    def get_spectrum_by_index(self, i):
+        """
+            Returns i-th spectrum of the library (files are sorted by name)
+            @param int i: index of spectrum
+
+            @return np.array (x, y) : x - array of wavelength in A, y - array of intensity in Arb. Units
+        """
+        a, b = self.offsets[i], self.offsets[i + 1]
+        return np.array(self.x[a:b]), np.array(self.y[a:b])
+
+    def find(self, t_rot, t_vib):
+        """
+            Finds indices of spectra with given temperatures from files headers
+            @param t_rot: rotational temperature in K
+            @param t_vib: vibrational temperature in K
+
+            @return np.array of indices
+        """
+        return np.flatnonzero((self.params[:, 0] == t_rot) & (self.params[:, 1] == t_vib))
@@ -97,6 +97,211 @@ class SpectrumModifier:
         # y_new = f(x_new)
         return x_new, y_new
 
+    def make_standard_xgrid_basis(self, x, start = 5036., stop = 5200., num = 50, endpoint = True):
+        """
+           Builds linear operator of the cubic interpolation used in make_standard_xgrid_spectrum.
+           Interpolating spline (s=0) depends linearly on y, so it is enough to interpolate the identity matrix once
+           and then every spectrum on the same x-grid is standardized by a single matrix product.
+
+           @param x: x-coordinate, wavelength in A (np.array) shared by all spectra
+           @param start: the starting x-value of the interval. Should be inside x-range (default is 5036)
+           @param stop: the end x-value of the interval. Should be inside x-range (default is 5200)
+
+           @return: x_new, basis - (tuple of two np.arrays) standardized xgrid (num,) and interpolation matrix (num, len(x))
+        """
+        x_new = np.linspace(start, stop, num, endpoint)
+        # the same not-a-knot cubic spline as interpolate.splrep(x, y, s=0)
+        basis = interpolate.make_interp_spline(x, np.eye(len(x)), k=3)(x_new)
+        return x_new, basis
+
+    def detrend_by_line_from_2left_right_minpoints_2d(self, x, y2d):
+        """
+           Batch version of detrend_by_line_from_2left_right_minpoints for the matrix of spectra on the same x-grid
+
+           @param x: np.array, x-coordinate (wavelength in A) shared by all spectra
+           @param y2d: 2D np.array (n_spectra, len(x)), intensity in arb.units (one spectrum per row)
+
+           @return: y_detrended - 2D np.array, detrended spectra to the same x
+        """
+        y2d = np.asarray(y2d, dtype='float64')
+        rows = np.arange(y2d.shape[0])
+        mid_indx = int(y2d.shape[1] / 2)
+        left_min_indx = np.argmin(y2d[:, 0:mid_indx], axis=1)
+        right_min_indx = np.argmin(y2d[:, mid_indx + 1:], axis=1) + mid_indx + 1
+        y_detrended = y2d - np.amin(y2d, axis=1)[:, np.newaxis]
+        y_left = y_detrended[rows, left_min_indx][:, np.newaxis]
+        y_right = y_detrended[rows, right_min_indx][:, np.newaxis]
+        x_left = x[left_min_indx][:, np.newaxis]
+        x_right = x[right_min_indx][:, np.newaxis]
+        y_detrended = y_detrended - y_left - ((y_right - y_left) / (x_right - x_left)) * (x[np.newaxis, :] - x_left)
+        return y_detrended
+
+    def make_standard_xgrid_spectra(self, x, y2d, start = 5036., stop = 5200., num = 50, endpoint = True):
+        """
+           Batch version of make_standard_xgrid_spectrum. Interpolation basis is built once (see make_standard_xgrid_basis)
+           and applied to all rows as one matrix product
+
+           @param x: x-coordinate, wavelength in A (np.array) shared by all spectra
+           @param y2d: 2D np.array (n_spectra, len(x)), intensity in a.u. (one spectrum per row)
+           @param start: the starting x-value of the interval. Should be inside x-range (default is 5036)
+           @param stop: the end x-value of the interval. Should be inside x-range (default is 5200)
+
+           @return: x_new, y_new - (tuple of np.arrays) standardized xgrid (num,) and spectra (n_spectra, num)
+        """
+        x_new, basis = self.make_standard_xgrid_basis(x, start, stop, num, endpoint)
+        y_new = np.dot(np.asarray(y2d, dtype='float64'), basis.T)
+        return x_new, y_new
+
+    def translate_OY_along_x_to_merge_lines_2d(self, spectra_x, spectra_y2d, expected_max, max_region, line = Consts.H_BETTA_ANG['486nm 4to2 Aqua 2.55eV']):
+        """
+           Batch version of translate_OY_along_x_to_merge_lines. Every row is shifted by its own integer number of grid steps,
+           empty places are filled with NaN (like scipy shift with cval=NaN)
+
+           @param spectra_x: x-coordinate, wavelength in A (np.array) shared by all spectra, equidistant
+           @param spectra_y2d: 2D np.array (n_spectra, len(spectra_x)), intensity in a.u. (one spectrum per row)
+           @param expected_max: x-coordinate in A of expected peak which will be at the same place as given line
+           @param max_region: region boundary (x-coordinate in A) for searching expected peak (expected_max - max_region/2; expected_max + max_region/2;)
+           @param line: x-coordinate in A where expected peak should be (fit to given line)
+
+           @return: y - 2D np.array of intensity in arb. units, each row shifted along x to merge its peak with given line
+        """
+        spectra_y2d = np.asarray(spectra_y2d, dtype='float64')
+        mask = (spectra_x > (expected_max - (max_region/2.))) & (spectra_x < (expected_max + (max_region/2.)))
+        x_mask = spectra_x[mask]
+        step = x_mask[1] - x_mask[0]
+        x_shift = line - x_mask[np.argmax(spectra_y2d[:, mask], axis=1)]
+        arg_shift = np.where(np.abs(x_shift) > step/2, np.rint(x_shift/step), 0).astype(int)
+        # y_shifted[i, j] = y[i, j - arg_shift[i]]
+        src = np.arange(spectra_y2d.shape[1])[np.newaxis, :] - arg_shift[:, np.newaxis]
+        inside = (src >= 0) & (src < spectra_y2d.shape[1])
+        y_shifted = np.take_along_axis(spectra_y2d, np.clip(src, 0, spectra_y2d.shape[1] - 1), axis=1)
+        y_shifted[~inside] = np.nan
+        return y_shifted
+
+    def find_peak_subpixel_2d(self, spectra_x, spectra_y2d, expected_max, max_region):
+        """
+           Positions of the highest peak of every row near expected_max refined by parabola through the maximum and its two neighbours
+
+           @param spectra_x: x-coordinate, wavelength in A (np.array) shared by all spectra, equidistant
+           @param spectra_y2d: 2D np.array (n_spectra, len(spectra_x)), intensity in a.u. (one spectrum per row)
+           @param expected_max: x-coordinate in A of expected peak
+           @param max_region: region boundary (x-coordinate in A) for searching expected peak (expected_max - max_region/2; expected_max + max_region/2;)
+
+           @return: x_peak - np.array (n_spectra,) of peak positions in A
+        """
+        spectra_y2d = np.asarray(spectra_y2d, dtype='float64')
+        mask = (spectra_x > (expected_max - (max_region/2.))) & (spectra_x < (expected_max + (max_region/2.)))
+        index = np.flatnonzero(mask)
+        step = spectra_x[1] - spectra_x[0]
+        rows = np.arange(spectra_y2d.shape[0])
+        k = index[np.argmax(spectra_y2d[:, mask], axis=1)]
+        left = spectra_y2d[rows, np.clip(k - 1, 0, None)]
+        center = spectra_y2d[rows, k]
+        right = spectra_y2d[rows, np.clip(k + 1, None, spectra_y2d.shape[1] - 1)]
+        denominator = left - 2 * center + right
+        inside = (k > 0) & (k < spectra_y2d.shape[1] - 1) & (denominator < 0)
+        delta = np.zeros(len(k))
+        delta[inside] = 0.5 * (left - right)[inside] / denominator[inside]
+        return spectra_x[k] + delta * step
+
+    def find_shift_by_xcorr_2d(self, spectra_y2d, reference_y, max_lag):
+        """
+           Sub-pixel shifts of all rows relative to reference spectrum: maximum of cross-correlation computed for the whole matrix
+           by one FFT (rfft) and refined by parabola
+
+           @param spectra_y2d: 2D np.array (n_spectra, n), intensity in a.u. (one spectrum per row)
+           @param reference_y: np.array (n,) reference spectrum on the same x-grid
+           @param max_lag: maximal absolute shift in grid steps
+
+           @return: lag - np.array (n_spectra,) in grid steps, row i is reference shifted right by lag[i]
+        """
+        spectra_y2d = np.asarray(spectra_y2d, dtype='float64')
+        n = spectra_y2d.shape[1]
+        size = 2 * n
+        y = spectra_y2d - spectra_y2d.mean(axis=1)[:, np.newaxis]
+        r = reference_y - np.mean(reference_y)
+        corr = np.fft.irfft(np.fft.rfft(y, size, axis=1) * np.conj(np.fft.rfft(r, size)), size, axis=1)
+        max_lag = int(min(max_lag, n - 2))
+        # lags -max_lag..max_lag, negative lags are at the end of the circular correlation
+        lags = np.arange(-max_lag, max_lag + 1)
+        corr = corr[:, lags % size]
+        rows = np.arange(corr.shape[0])
+        k = np.clip(np.argmax(corr, axis=1), 1, len(lags) - 2)
+        left, center, right = corr[rows, k - 1], corr[rows, k], corr[rows, k + 1]
+        denominator = left - 2 * center + right
+        delta = np.where(denominator < 0, 0.5 * (left - right) / np.where(denominator < 0, denominator, -1.), 0.)
+        return lags[k] + delta
+
+    def shift_rows_subpixel_2d(self, spectra_y2d, arg_shift):
+        """
+           Shifts every row by its own fractional number of grid steps by FFT phase shift (band-limited interpolation keeps
+           peak heights, unlike linear one), places left empty are filled by the edge values (no NaN)
+
+           @param spectra_y2d: 2D np.array (n_spectra, n), intensity in a.u. (one spectrum per row)
+           @param arg_shift: np.array (n_spectra,) of shifts in grid steps, positive - to the right
+
+           @return: y - 2D np.array, y[i, j] = spectra_y2d[i, j - arg_shift[i]]
+        """
+        spectra_y2d = np.asarray(spectra_y2d, dtype='float64')
+        arg_shift = np.asarray(arg_shift, dtype='float64')[:, np.newaxis]
+        n = spectra_y2d.shape[1]
+        j = np.arange(n)[np.newaxis, :]
+        first, last = spectra_y2d[:, :1], spectra_y2d[:, -1:]
+        slope = (last - first) / (n - 1)
+        # the line between edge values is removed, so the rest starts and ends at zero and zero padding does not wrap
+        # a jump around; the line itself is shifted exactly and gives the edge values outside the row
+        rest = spectra_y2d - first - slope * j
+        # odd length has no Nyquist term, which can not be shifted by a fraction of a step
+        size = 2 * ((n + int(np.ceil(np.abs(arg_shift).max(initial=0.)))) // 2) + 17
+        phase = np.exp(-2j * np.pi * np.fft.rfftfreq(size)[np.newaxis, :] * arg_shift)
+        shifted = np.fft.irfft(np.fft.rfft(rest, size, axis=1) * phase, size, axis=1)[:, :n]
+        return shifted + first + slope * np.clip(j - arg_shift, 0, n - 1)
+
+    def translate_OY_along_x_to_merge_lines_subpixel_2d(self, spectra_x, spectra_y2d, expected_max, max_region,
+                                                        line = Consts.H_BETTA_ANG['486nm 4to2 Aqua 2.55eV'], method = 'parabolic',
+                                                        reference_y = None):
+        """
+           Sub-pixel version of translate_OY_along_x_to_merge_lines_2d: shifts are not rounded to grid steps and edges are
+           filled by edge values, so no NaN has to be zeroed afterwards (notebook 3a)
+
+           @param spectra_x: x-coordinate, wavelength in A (np.array) shared by all spectra, equidistant
+           @param spectra_y2d: 2D np.array (n_spectra, len(spectra_x)), intensity in a.u. (one spectrum per row)
+           @param expected_max: x-coordinate in A of expected peak which will be at the same place as given line
+           @param max_region: region boundary (x-coordinate in A) for searching expected peak (expected_max - max_region/2; expected_max + max_region/2;)
+           @param line: x-coordinate in A where expected peak should be (fit to given line)
+           @param method: 'parabolic' - peak position refined by parabola, 'xcorr' - cross-correlation with reference_y (whole band shape is used)
+           @param reference_y: reference spectrum on spectra_x with its peak at line, for 'xcorr' (default None - mean of 'parabolic' aligned rows)
+
+           @return: y - 2D np.array of intensity in arb. units, each row shifted along x to merge its peak with given line
+        """
+        spectra_y2d = np.asarray(spectra_y2d, dtype='float64')
+        step = spectra_x[1] - spectra_x[0]
+        if method == 'parabolic':
+            arg_shift = (line - self.find_peak_subpixel_2d(spectra_x, spectra_y2d, expected_max, max_region)) / step
+        elif method == 'xcorr':
+            if reference_y is None:
+                reference_y = self.translate_OY_along_x_to_merge_lines_subpixel_2d(spectra_x, spectra_y2d, expected_max, max_region,
+                                                                                   line, 'parabolic').mean(axis=0)
+            arg_shift = -self.find_shift_by_xcorr_2d(spectra_y2d, reference_y, max_region / 2. / step)
+        else:
+            raise ValueError("Unknown method '" + method + "', use 'parabolic' or 'xcorr'")
+        return self.shift_rows_subpixel_2d(spectra_y2d, arg_shift)
+
+    def normalize_by_division_with_max_intensity_2d(self, x, y2d, max_region = 100., expected_max = Consts.C2_SWAN_BAND['vibr trans (0,0)']):
+        """
+           Batch version of normalize_by_division_with_max_intensity, every row is divided by its own peak
+
+           @param x: x-coordinate, wavelength in A (np.array) shared by all spectra
+           @param y2d: 2D np.array (n_spectra, len(x)), intensity in a.u. (one spectrum per row)
+           @param max_region: region boundary (x-coordinate in A) for searching expected peak (expected_max - max_region/2; expected_max + max_region/2;)
+           @param expected_max: x-coordinate in A of expected peak (as Default - Consts.C2_SWAN_BAND['vibr trans (0,0)'] = 5165.2A)
+
+           @return: y_div - 2D np.array of intensity in arb. units, normalized (devided) by specified local peak
+        """
+        mask = (x > (expected_max - (max_region / 2.))) & (x < (expected_max + (max_region / 2.)))
+        y_div = y2d/np.amax(y2d[:, mask], axis=1)[:, np.newaxis]
+        return y_div
+
 if __name__ == '__main__':
     start_time = time.time()
     spectrum_reader = SpectrumReader()
@@ -6,7 +6,9 @@ Rinat Ismagilov
 """
 
 import numpy as np
+import pandas as pd
 import re, time
+from utils.StageProfiler import profiler
 
 class SpectrumReader:
     def read_swan_band(self, file_name='SWAN_band'):
@@ -16,22 +18,25 @@ class SpectrumReader:
 
             @return np.array (x, y) : x - array of wavelength in A, y - array of intensity in Arb. Units
         """
+        params, x, y = self.read_swan_band_with_params(file_name)
+        return x, y
+
+    def read_swan_band_with_params(self, file_name='SWAN_band'):
+        """
+            Reads swan_spectrum from file file_name together with its header
+            @param file_name: file name with spectrum data at the same path (default 'SWAN_band')
+
+            @return (params, x, y) : params - np.array [t_rot, t_vib, i_max, n0] from the 4 header lines,
+                x - array of wavelength in A, y - array of intensity in Arb. Units
+        """
 
         with open(file_name, 'r') as f:
-            strlist = f.readlines()
-        # 4 lines in file are additional parameters
-        t_rot = float(re.sub(r'[^=]+=\s*(\S+)\s*', r'\1', strlist[0]))
-        t_vib = float(re.sub(r'[^=]+=\s*(\S+)\s*', r'\1', strlist[1]))
-        i_max = float(re.sub(r'[^=]+=\s*(\S+)\s*', r'\1', strlist[2]))
-        n0 = float(re.sub(r'[^=]+=\s*(\S+)\s*', r'\1', strlist[3]))
-        x = []
-        y = []
-        for s in strlist[4:]:
-            l, i = [float(x) for x in s.split()]
-            x.append(l)
-            y.append(i)
-        x, y = np.array(x), np.array(y)
-        return x, y
+            # 4 lines in file are additional parameters
+            header = [f.readline() for i in range(4)]
+            body = f.read()
+        params = np.array([float(re.sub(r'[^=]+=\s*(\S+)\s*', r'\1', s)) for s in header])
+        x, y = self.parse_two_columns(body)
+        return params, x, y
 
     def read_exp_spectrum(self, file_name='exp.txt'):
 
@@ -44,16 +49,102 @@ class SpectrumReader:
 
         # загрузка экспериментальных данных
         with open(file_name, 'r') as f:
-            strlist = f.readlines()
-        exp_x = []
-        exp_y = []
-        for s in strlist:
-            l, i = [float(x) for x in s.split()]
-            exp_x.append(l)
-            exp_y.append(i)
-        exp_x, exp_y = np.array(exp_x), np.array(exp_y)
+            exp_x, exp_y = self.parse_two_columns(f.read())
         return exp_x, exp_y
 
+    def parse_two_columns(self, text):
+        """
+            Parses whitespace separated two-column text in one numpy call (instead of split() and float() per line)
+            @param text: string with pairs of numbers, one pair per line
+
+            @return np.array (x, y) : first and second column
+            @raise ValueError: if a token is not a number or a line has not exactly two values
+        """
+        values = np.fromstring(text, dtype='float64', sep=' ')
+        # fromstring stops silently at the first malformed token, so the count is checked
+        n_lines = len(re.findall(r'^[ \t]*\S', text, re.M))
+        n_pairs = len(re.findall(r'^[ \t]*\S+[ \t]+\S+[ \t\r]*$', text, re.M))
+        if n_pairs != n_lines or values.size != 2 * n_lines:
+            raise ValueError("Malformed two-column data: %d numbers parsed, %d lines of which %d have two values"
+                             % (values.size, n_lines, n_pairs))
+        xy = values.reshape(-1, 2)
+        return xy[:, 0].copy(), xy[:, 1].copy()
+
+    def read_mpma_wavelength(self, file_name, n_channels=1024):
+        """
+            Reads wavelength header row of Hamamatsu MPMA file (tab-separated, comma decimals; first cell of the row is not a wavelength)
+            @param file_name: MPMA file name (e.g. 'MPMA_20191010131801.txt')
+            @param n_channels: number of spectrometer channels (default 1024)
+
+            @return np.array wl : wavelength in nm as written by spectrometer (notebooks multiply it by 10 to get A)
+        """
+        with open(file_name, 'r') as f:
+            header = f.readline()
+        cells = header.rstrip('\r\n').split('\t')[1:n_channels + 1]
+        wl = np.array([float(c.replace(',', '.')) for c in cells], dtype='float64')
+        return wl
+
+    def iter_mpma_spectra(self, file_name, n_channels=1024, chunk_rows=1000, dtype='float64'):
+        """
+            Generator over spectra rows of Hamamatsu MPMA file. Keeps only chunk_rows spectra in memory at once.
+            Comma decimals are parsed directly by pandas C-parser (no intermediate python strings)
+            @param file_name: MPMA file name (e.g. 'MPMA_20191010131801.txt')
+            @param n_channels: number of spectrometer channels (default 1024); extra columns are ignored
+            @param chunk_rows: number of spectra in one chunk (default 1000)
+            @param dtype: dtype of intensity arrays, e.g. 'float32' halves the memory (default 'float64')
+
+            @return generator of tuples (t, intens) : t - np.array (chunk_rows,) of time in s, intens - np.array (chunk_rows, n_channels)
+        """
+        col_types = dict((i, dtype) for i in range(1, n_channels + 1))
+        col_types[0] = 'float64'
+        reader = pd.read_csv(file_name, sep='\t', header=None, skiprows=1, usecols=range(n_channels + 1),
+                             decimal=',', dtype=col_types, chunksize=chunk_rows, engine='c')
+        for chunk in reader:
+            values = chunk.values
+            yield values[:, 0].astype('float64'), np.ascontiguousarray(values[:, 1:], dtype=dtype)
+
+    def read_mpma_spectra(self, file_name, n_channels=1024, chunk_rows=1000, dtype='float64'):
+        """
+            Reads whole Hamamatsu MPMA file chunk by chunk into preallocated arrays (replacement of read_csv(dtype=str) + str.replace)
+            @param file_name: MPMA file name (e.g. 'MPMA_20191010131801.txt')
+            @param n_channels: number of spectrometer channels (default 1024); extra columns are ignored
+            @param chunk_rows: number of spectra parsed at once (default 1000)
+            @param dtype: dtype of intensity array, 'float32' is enough for the detector counts (default 'float64')
+
+            @return np.array (t, wl, intens) : t - time in s (n_spectra,), wl - wavelength in nm (n_channels,), intens - (n_spectra, n_channels)
+        """
+        with profiler.stage("read"):
+            wl = self.read_mpma_wavelength(file_name, n_channels)
+            n_rows = self.count_data_rows(file_name) - 1
+            t = np.empty(n_rows, dtype='float64')
+            intens = np.empty((n_rows, len(wl)), dtype=dtype)
+            start = 0
+            for t_chunk, intens_chunk in self.iter_mpma_spectra(file_name, len(wl), chunk_rows, dtype):
+                stop = start + len(t_chunk)
+                t[start:stop], intens[start:stop] = t_chunk, intens_chunk
+                start = stop
+        return t[:start], wl, intens[:start]
+
+    def count_data_rows(self, file_name, block_size=1 << 24):
+        """
+            Counts lines (newline characters, blank lines included) of text file by reading it in binary blocks;
+            used as an upper bound of the number of spectra
+            @param file_name: text file name
+            @param block_size: size of binary block in bytes (default 16MB)
+
+            @return int : number of lines
+        """
+        n_lines, last = 0, b'\n'
+        with open(file_name, 'rb') as f:
+            block = f.read(block_size)
+            while block:
+                n_lines += block.count(b'\n')
+                last = block[-1:]
+                block = f.read(block_size)
+        if last != b'\n':
+            n_lines += 1
+        return n_lines
+
 
 if __name__ == '__main__':
     start_time = time.time()
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import time
+import threading
+import tracemalloc
+import numpy as np
+
+
+class _NullStage:
+    """
+        Context manager used when profiling is switched off - does nothing
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    """
+        Context manager measuring one call of a named stage
+    """
+
+    def __init__(self, profiler, name, data):
+        self.profiler = profiler
+        self.name = name
+        self.data = data
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.profiler._exit(self)
+        return False
+
+
+class StageProfiler:
+    """
+        Opt-in instrumentation of processing stages (read, mask, detrend, standardize, shift, normalize, predict).
+        Stages are marked in code by
+            with profiler.stage("detrend", y2d):
+                ...
+        and cost one method call when profiling is off. When on, for every stage name calls, time, array sizes and
+        (optionally) peak traced allocation are aggregated, and every call is kept as an event for trace export, e.g. in a notebook:
+            from utils.StageProfiler import profiler
+            profiler.enable(trace_memory=True)
+            x_std, y_std = standardizator.get_std_xy_2d(wl, intens)
+            print(profiler.report())
+            profiler.export_chrome_trace("trace.json")   # chrome://tracing or https://ui.perfetto.dev
+    """
+
+    def __init__(self, max_events = 100000):
+        """
+            Constructor
+            @param int max_events: maximal number of kept trace events, aggregation goes on after the limit (default 100000)
+
+            @return: no return value
+        """
+        self.enabled = False
+        self.trace_memory = False
+        self.max_events = max_events
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self, trace_memory = False):
+        """
+            Switches profiling on
+            @param Boolean trace_memory: measure peak allocation by tracemalloc (noticeably slows allocations down, default False)
+
+            @return: no return value
+        """
+        self.trace_memory = trace_memory
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+        self.enabled = True
+
+    def disable(self):
+        """
+            Switches profiling off, collected data are kept
+
+            @return: no return value
+        """
+        self.enabled = False
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def reset(self):
+        """
+            Clears collected data (start of a new run)
+
+            @return: no return value
+        """
+        self.stats = {}
+        self.events = []
+        self.origin = time.perf_counter()
+        self._started_tracemalloc = getattr(self, "_started_tracemalloc", False)
+
+    def stage(self, name, data = None):
+        """
+            Context manager of a named stage
+            @param string name: stage name
+            @param data: optional np.array processed by the stage, its size is recorded
+
+            @return context manager
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, data)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, stage):
+        stack = self._stack()
+        stage.parent = stack[-1] if stack else None
+        stage.max_peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # peak counter is global: parent keeps what was reached before the child resets it
+            if stage.parent is not None:
+                stage.parent.max_peak = max(stage.parent.max_peak, peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            stage.start_memory = current
+        stack.append(stage)
+        stage.started = time.perf_counter()
+
+    def _exit(self, stage):
+        seconds = time.perf_counter() - stage.started
+        self._stack().pop()
+        peak = 0
+        if self.trace_memory and tracemalloc.is_tracing():
+            absolute = max(tracemalloc.get_traced_memory()[1], stage.max_peak)
+            peak = absolute - stage.start_memory
+            if stage.parent is not None:
+                stage.parent.max_peak = max(stage.parent.max_peak, absolute)
+        size = int(np.size(stage.data)) if stage.data is not None else 0
+        nbytes = int(getattr(stage.data, "nbytes", 0)) if stage.data is not None else 0
+
+        with self._lock:
+            s = self.stats.get(stage.name)
+            if s is None:
+                s = self.stats[stage.name] = {"stage": stage.name, "calls": 0, "seconds": 0., "min_seconds": np.inf,
+                                              "max_seconds": 0., "items": 0, "bytes": 0, "peak_bytes": 0}
+            s["calls"] += 1
+            s["seconds"] += seconds
+            s["min_seconds"] = min(s["min_seconds"], seconds)
+            s["max_seconds"] = max(s["max_seconds"], seconds)
+            s["items"] += size
+            s["bytes"] += nbytes
+            s["peak_bytes"] = max(s["peak_bytes"], peak)
+            if len(self.events) < self.max_events:
+                self.events.append((stage.name, stage.started - self.origin, seconds, threading.current_thread().ident,
+                                    size, nbytes, peak))
+
+    def records(self):
+        """
+            Aggregated statistics of the run
+
+            @return list of dicts (stage, calls, seconds, mean_seconds, min_seconds, max_seconds, items, bytes, peak_bytes),
+                sorted by total time
+        """
+        with self._lock:
+            result = [dict(s) for s in self.stats.values()]
+        for s in result:
+            s["mean_seconds"] = s["seconds"] / s["calls"]
+        return sorted(result, key=lambda s: -s["seconds"])
+
+    def report(self):
+        """
+            @return string : table of aggregated statistics
+        """
+        lines = ["%-14s %8s %10s %12s %12s %10s" % ("stage", "calls", "total s", "mean ms", "items", "peak MB")]
+        for s in self.records():
+            lines.append("%-14s %8d %10.3f %12.3f %12d %10.1f" % (s["stage"], s["calls"], s["seconds"], 1e3 * s["mean_seconds"],
+                                                                  s["items"], s["peak_bytes"] / 2. ** 20))
+        return "\n".join(lines)
+
+    def export_records(self, file_name):
+        """
+            Writes aggregated statistics to json file
+            @param string file_name: output file
+
+            @return: no return value
+        """
+        with open(file_name, 'w') as f:
+            json.dump(self.records(), f, indent=1)
+
+    def export_chrome_trace(self, file_name):
+        """
+            Writes every stage call as complete event of Chrome Trace Event format
+            (viewable in chrome://tracing or https://ui.perfetto.dev)
+            @param string file_name: output file
+
+            @return: no return value
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+        trace = [{"name": name, "cat": "stage", "ph": "X", "ts": 1e6 * start, "dur": 1e6 * seconds, "pid": pid, "tid": tid,
+                  "args": {"items": size, "bytes": nbytes, "peak_bytes": peak}}
+                 for name, start, seconds, tid, size, nbytes, peak in events]
+        with open(file_name, 'w') as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms"}, f)
+
+
+# shared instance used by instrumented modules
+profiler = StageProfiler()
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from utils.pyOESconsts import Consts
+
+# second radiation constant hc/k, cm*K
+C2_RADIATION = 1.4387769
+
+# C2 molecular constants in cm-1 (Huber & Herzberg): Te, we, wexe, Be, alpha_e, De
+C2_D3PIG = {"Te": 20022.50, "we": 1788.22, "wexe": 16.440, "Be": 1.7527, "alpha_e": 0.01608, "De": 6.74e-6}
+C2_A3PIU = {"Te": 716.24, "we": 1641.35, "wexe": 11.670, "Be": 1.6324, "alpha_e": 0.01661, "De": 6.44e-6}
+
+# approximate Franck-Condon factors q(v', v'') of the Swan system; may be replaced by constructor parameter
+SWAN_FRANCK_CONDON = {
+    (0, 0): 0.721, (1, 1): 0.328, (2, 2): 0.111, (3, 3): 0.021, (4, 4): 0.002,
+    (1, 0): 0.222, (2, 1): 0.354, (3, 2): 0.378, (4, 3): 0.336,
+    (0, 1): 0.223, (1, 2): 0.315, (2, 3): 0.294, (3, 4): 0.231,
+}
+
+
+def _swan_spectra_chunk(args):
+    # top-level function - it is pickled and sent to worker processes
+    synthesizer, t_rot, t_vib, kwargs = args
+    return synthesizer.swan_spectra(t_rot, t_vib, n_jobs=1, **kwargs)[1]
+
+
+class SwanBandSynthesizer:
+    """
+        In-process NumPy model of C2 Swan band (d3Pi_g -> a3Pi_u) emission spectrum, replacement of SWAN_BAND.exe automation
+        (see SpectrumGenerator.ModelSpectrumGenerator). Spin components of the Pi-Pi transition are not resolved (they are far below
+        the apparatus function width), so the band is built from P, Q, R branches of every vibrational band of the sequence:
+            line position - term values differences of upper and lower states (converted to wavelength in air),
+            line intensity - q(v',v'') * nu^4 * Honl-London factor * exp(-hc G(v')/kT_vib) * exp(-hc F(v',J')/kT_rot),
+            profile - gaussian apparatus function with FWHM full_width.
+        Line positions do not depend on temperatures, so spectra of many (T_rot, T_vib) are a matrix product of line intensities
+        and precomputed line profiles.
+    """
+
+    def __init__(self, x = None, j_max = 100, v_max = 4, franck_condon = None):
+        """
+            Constructor
+            @param x: np.array of wavelength grid in A (default 4800..5200.8A with 0.1A step, exe generates spectra only until 5200.8A)
+            @param int j_max: maximal rotational quantum number (default 100)
+            @param int v_max: maximal upper vibrational level of the sequence (default 4)
+            @param dict franck_condon: Franck-Condon factors {(v', v''): q} (default SWAN_FRANCK_CONDON)
+
+            @return: no return value
+        """
+        self.x = np.arange(4800., 5200.85, 0.1) if x is None else np.asarray(x, dtype='float64')
+        self.j_max = j_max
+        self.v_max = v_max
+        self.franck_condon = SWAN_FRANCK_CONDON if franck_condon is None else franck_condon
+        self._profiles = {}
+
+    def vibrational_term(self, state, v):
+        return state["we"] * (v + 0.5) - state["wexe"] * (v + 0.5) ** 2
+
+    def rotational_term(self, state, v, j):
+        b_v = state["Be"] - state["alpha_e"] * (v + 0.5)
+        return b_v * j * (j + 1) - state["De"] * (j * (j + 1)) ** 2
+
+    def vacuum_to_air(self, wl_vac):
+        """
+            Converts vacuum wavelength to air wavelength (Edlen formula)
+            @param wl_vac: np.array of vacuum wavelength in A
+
+            @return np.array of air wavelength in A
+        """
+        sigma2 = (1.e4 / wl_vac) ** 2
+        n = 1. + 1.e-8 * (8342.13 + 2406030. / (130. - sigma2) + 15997. / (38.9 - sigma2))
+        return wl_vac / n
+
+    def lines(self, v_upper = 0, delta_v = 0):
+        """
+            Lines of the Swan band sequence delta_v = v' - v'' with v' from v_upper to v_max
+            @param int v_upper: lowest upper vibrational level
+            @param int delta_v: difference between v_upper and lower state
+
+            @return (wl, weight, g_upper, f_upper) : np.arrays of line wavelength in air (A), temperature independent intensity factor,
+                vibrational and rotational energy of upper level in cm-1
+        """
+        wl, weight, g_upper, f_upper = [], [], [], []
+        j_low = np.arange(1, self.j_max + 1, dtype='float64')
+        for v1 in range(v_upper, self.v_max + 1):
+            v2 = v1 - delta_v
+            q = self.franck_condon.get((v1, v2), 0.)
+            if v2 < 0 or q == 0.:
+                continue
+            g1 = self.vibrational_term(C2_D3PIG, v1)
+            g2 = self.vibrational_term(C2_A3PIU, v2)
+            band_origin = C2_D3PIG["Te"] + g1 - C2_A3PIU["Te"] - g2
+            # Honl-London factors of Pi-Pi transition (Lambda = 1) vs J'' for R (J' = J''+1), Q (J' = J''), P (J' = J''-1) branches
+            for dj, honl_london in ((1, j_low * (j_low + 2) / (j_low + 1)),
+                                    (0, (2 * j_low + 1) / (j_low * (j_low + 1))),
+                                    (-1, (j_low + 1) * (j_low - 1) / j_low)):
+                j_up = j_low + dj
+                ok = (j_up >= 1) & (honl_london > 0)
+                f1 = self.rotational_term(C2_D3PIG, v1, j_up[ok])
+                nu = band_origin + f1 - self.rotational_term(C2_A3PIU, v2, j_low[ok])
+                wl.append(self.vacuum_to_air(1.e8 / nu))
+                weight.append(q * nu ** 4 * honl_london[ok])
+                g_upper.append(np.full(len(nu), g1))
+                f_upper.append(f1)
+        return tuple(np.concatenate(a) for a in (wl, weight, g_upper, f_upper))
+
+    def line_profiles(self, wl, full_width):
+        """
+            Gaussian apparatus function of every line on the wavelength grid
+            @param wl: np.array of line wavelength in A
+            @param full_width: FWHM in A
+
+            @return 2D np.array (n_lines, len(x))
+        """
+        sigma = full_width / (2. * np.sqrt(2. * np.log(2.)))
+        return np.exp(-0.5 * ((self.x[np.newaxis, :] - wl[:, np.newaxis]) / sigma) ** 2)
+
+    def _band_operator(self, v_upper, delta_v, full_width):
+        # lines and profiles depend only on (v_upper, delta_v, full_width) - computed once per synthesizer
+        key = (v_upper, delta_v, full_width)
+        if key not in self._profiles:
+            wl, weight, g_upper, f_upper = self.lines(v_upper, delta_v)
+            # lines far outside the grid do not contribute
+            near = (wl > self.x[0] - 5 * full_width) & (wl < self.x[-1] + 5 * full_width)
+            self._profiles[key] = (weight[near], g_upper[near], f_upper[near], self.line_profiles(wl[near], full_width))
+        return self._profiles[key]
+
+    def swan_spectra(self, t_rot, t_vib, zero = 0, v_upper = 0, delta_v = 0, h_bet = 0, full_width = 15, max_amp = 1,
+                     chunk_size = 4096, n_jobs = 1):
+        """
+            Generates swan spectra for arrays of temperatures in one call
+            @param t_rot: np.array of rotational temperatures in K
+            @param t_vib: np.array of vibrational temperatures in K (the same length as t_rot)
+            @param zero: chosen ground "zero" value of modeled spectrum (default 0)
+            @param v_upper: lowest quantum number of upper vibrational state of C2 (default 0)
+            @param delta_v: difference between v_upper and lower state (default 0)
+            @param h_bet: hydrogen line amplitude (added only for v_upper = delta_v = 0, like exe does)
+            @param full_width: FWHM of the hydrogen line in A (apparatus function - spectrometer)
+            @param max_amp: maximum amplitude of modeled C2 band
+            @param chunk_size: number of spectra computed by one matrix product (bounds memory)
+            @param n_jobs: number of worker processes (default 1 - in this process)
+
+            @return np.array (x, y) : x - array of wavelength in A, y - 2D array (len(t_rot), len(x)) of intensity in Arb. Units
+        """
+        t_rot = np.atleast_1d(np.asarray(t_rot, dtype='float64'))
+        t_vib = np.atleast_1d(np.asarray(t_vib, dtype='float64'))
+        kwargs = dict(zero=zero, v_upper=v_upper, delta_v=delta_v, h_bet=h_bet, full_width=full_width, max_amp=max_amp,
+                      chunk_size=chunk_size)
+        if n_jobs != 1 and len(t_rot) > chunk_size:
+            bounds = range(0, len(t_rot), chunk_size)
+            tasks = [(self, t_rot[i:i + chunk_size], t_vib[i:i + chunk_size], kwargs) for i in bounds]
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                return self.x, np.concatenate(list(executor.map(_swan_spectra_chunk, tasks)))
+
+        weight, g_upper, f_upper, profiles = self._band_operator(v_upper, delta_v, full_width)
+        # energies relative to the lowest upper level keep exponents in a safe range
+        g_upper, f_upper = g_upper - g_upper.min(), f_upper - f_upper.min()
+        hydrogen = np.zeros(len(self.x))
+        if v_upper == 0 and delta_v == 0 and h_bet != 0:
+            hydrogen = h_bet * self.line_profiles(np.array([Consts.H_BETTA_ANG['486nm 4to2 Aqua 2.55eV']]), full_width)[0]
+
+        y = np.empty((len(t_rot), len(self.x)))
+        for i in range(0, len(t_rot), chunk_size):
+            tr, tv = t_rot[i:i + chunk_size, np.newaxis], t_vib[i:i + chunk_size, np.newaxis]
+            intens = weight * np.exp(-C2_RADIATION * (g_upper / tv + f_upper / tr))
+            y_chunk = np.dot(intens, profiles)
+            y[i:i + chunk_size] = max_amp * y_chunk / np.amax(y_chunk, axis=1)[:, np.newaxis] + hydrogen + zero
+        return self.x, y
+
+    def swan_spectrum(self, t_rot, t_vib, zero = 0, v_upper = 0, delta_v = 0, h_bet = 0, full_width = 15, max_amp = 1):
+        """
+            Generates one swan spectrum, the same parameters as SpectrumGenerator.ModelSpectrumGenerator.swan_spectrum
+            @param t_rot: rotational temperature in K
+            @param t_vib: vibrational temperature in K
+            (other parameters - see swan_spectra)
+
+            @return np.array (x, y) : x - array of wavelength in A, y - array of intensity in Arb. Units
+        """
+        x, y = self.swan_spectra(t_rot, t_vib, zero=zero, v_upper=v_upper, delta_v=delta_v, h_bet=h_bet,
+                                 full_width=full_width, max_amp=max_amp)
+        return x, y[0]
@@ -7,9 +7,10 @@ Rinat Ismagilov
 """
 
 import numpy as np
-from utils import SpectrumGenerator, SpectrumModifier, SpectrumReader
+from utils import SpectrumModifier, SpectrumReader
+from utils.SpectrumLibrary import SwanSpectrumLibrary
 from utils.pyOESconsts import Consts
-from utils import SpectrumGenerator
+from utils.StageProfiler import profiler
 
 
 class SwanSpectrumStandardizator:
@@ -18,11 +19,13 @@ class SwanSpectrumStandardizator:
         It wraps all functions similarly to "workflow_starter.py"
 
     """
-    def __init__(self, exp_dir = "spectra", theor_dir = "modeled spectra"):
+    def __init__(self, exp_dir = "spectra", theor_dir = "modeled spectra", theor_lib_dir = None):
         """
             Constructor
             @param string exp_dir: folder path, where experimental OES data are stored (default 'spectra')
             @param string theor_dir: folder path, where theoretically calculated OES data are stored (default 'modeled spectra')
+            @param string theor_lib_dir: folder path of binary SwanSpectrumLibrary built from theor_dir.
+                If given, theoretical spectra are taken from it instead of parsing text files (default None)
 
             @return: no return value
         """
@@ -30,6 +33,9 @@ class SwanSpectrumStandardizator:
         self.theor_dir = theor_dir
         self.reader = SpectrumReader.SpectrumReader()
         self.modifier = SpectrumModifier.SpectrumModifier()
+        self.theor_library = None
+        if theor_lib_dir is not None:
+            self.theor_library = SwanSpectrumLibrary(theor_dir, theor_lib_dir).open()
 
     def get_spectrum(self, file, is_theor_spectrum = True):
         """
@@ -41,53 +47,67 @@ class SwanSpectrumStandardizator:
         """
         if is_theor_spectrum:
 
-            x_theor, y_theor = self.reader.read_swan_band(file_name = self.theor_dir + "/" + file)
+            with profiler.stage("read"):
+                if self.theor_library is not None:
+                    x_theor, y_theor = self.theor_library.get_spectrum(file)
+                else:
+                    x_theor, y_theor = self.reader.read_swan_band(file_name = self.theor_dir + "/" + file)
 
             # 1 masking - working only with Swan Band (0,0). Exe file generates spectra only until 5200.8A
-            mask_theor = (x_theor > 5033.) & (x_theor < 5200.5)
-            x_theor_mask, y_theor_mask = np.copy(x_theor[mask_theor]), np.copy(y_theor[mask_theor])
+            with profiler.stage("mask", y_theor):
+                mask_theor = (x_theor > 5033.) & (x_theor < 5200.5)
+                x_theor_mask, y_theor_mask = np.copy(x_theor[mask_theor]), np.copy(y_theor[mask_theor])
 
             # 2 deTrending - substract the line
             # No need
 
             # 3 standardizing - make x grid similar to all spectra (includes interpolation to increase/decrease the number of X,Y points)
-            x_theor_std, y_theor_std = self.modifier.make_standard_xgrid_spectrum(x_theor_mask, y_theor_mask)
+            with profiler.stage("standardize", y_theor_mask):
+                x_theor_std, y_theor_std = self.modifier.make_standard_xgrid_spectrum(x_theor_mask, y_theor_mask)
 
             # 4 translation maximum - align to theoretical  5165.2A
-            y_theor_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_theor_std, y_theor_std,
-                                                                             expected_max=5165.2, max_region=200.,
-                                                                             line=Consts.C2_SWAN_BAND[
-                                                                                 'vibr trans (0,0)'])
+            with profiler.stage("shift", y_theor_std):
+                y_theor_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_theor_std, y_theor_std,
+                                                                                 expected_max=5165.2, max_region=200.,
+                                                                                 line=Consts.C2_SWAN_BAND[
+                                                                                     'vibr trans (0,0)'])
 
             # 5 normilize - devide by max C2 intensity
-            y_theor_new = self.modifier.normalize_by_division_with_max_intensity(x_theor_std, y_theor_shiftedC2)
+            with profiler.stage("normalize", y_theor_shiftedC2):
+                y_theor_new = self.modifier.normalize_by_division_with_max_intensity(x_theor_std, y_theor_shiftedC2)
 
             x, y = x_theor_std, y_theor_new
 
         else:
-            x_exp, y_exp = self.reader.read_exp_spectrum(file_name = self.exp_dir + "/" + file)
+            with profiler.stage("read"):
+                x_exp, y_exp = self.reader.read_exp_spectrum(file_name = self.exp_dir + "/" + file)
 
             # transform wavelength: nm --> A
             x_exp, y_exp = x_exp * 10, y_exp * 10
 
             # 1 masking - working only with Swan Band (0,0)
-            mask = (x_exp > 5033.) & (x_exp < 5220.)
-            # right boundary is a little bit bigger than for theoretical, because there might be huge shifts. Anyway it will be implicitly cut during standardization step; Left boundary empirically optimized
-            x_exp_mask, y_exp_mask = np.copy(x_exp[mask]), np.copy(y_exp[mask])
+            with profiler.stage("mask", y_exp):
+                mask = (x_exp > 5033.) & (x_exp < 5220.)
+                # right boundary is a little bit bigger than for theoretical, because there might be huge shifts. Anyway it will be implicitly cut during standardization step; Left boundary empirically optimized
+                x_exp_mask, y_exp_mask = np.copy(x_exp[mask]), np.copy(y_exp[mask])
 
             # 2 deTrending - substract the line
-            y_detrend = self.modifier.detrend_by_line_from_2left_right_minpoints(x_exp_mask, y_exp_mask)
+            with profiler.stage("detrend", y_exp_mask):
+                y_detrend = self.modifier.detrend_by_line_from_2left_right_minpoints(x_exp_mask, y_exp_mask)
 
             # 3 standardizing - make x grid similar to all spectra (includes interpolation to increase/decrease the number of X,Y points)
-            x_std, y_std = self.modifier.make_standard_xgrid_spectrum(x_exp_mask, y_detrend)
+            with profiler.stage("standardize", y_detrend):
+                x_std, y_std = self.modifier.make_standard_xgrid_spectrum(x_exp_mask, y_detrend)
 
             # 4 translation maximum - align to theoretical  5165.2A
-            y_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_std, y_std, expected_max=5165.2,
-                                                                       max_region=200.,
-                                                                       line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
+            with profiler.stage("shift", y_std):
+                y_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_std, y_std, expected_max=5165.2,
+                                                                           max_region=200.,
+                                                                           line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
 
             # 5 normilize - devide by max C2 intensity
-            y_exp_new = self.modifier.normalize_by_division_with_max_intensity(x_std, y_shiftedC2)
+            with profiler.stage("normalize", y_shiftedC2):
+                y_exp_new = self.modifier.normalize_by_division_with_max_intensity(x_std, y_shiftedC2)
 
             x, y = x_std, y_exp_new
 
@@ -106,26 +126,76 @@ class SwanSpectrumStandardizator:
         x_exp, y_exp = x_exp * 10, y_exp * 10
 
         # 1 masking - working only with Swan Band (0,0)
-        mask = (x_exp > 5033.) & (x_exp < 5220.)
-        # right boundary is a little bit bigger than for theoretical, because there might be huge shifts. Anyway it will be implicitly cut during standardization step; Left boundary empirically optimized
-        x_exp_mask, y_exp_mask = np.copy(x_exp[mask]), np.copy(y_exp[mask])
+        with profiler.stage("mask", y_exp):
+            mask = (x_exp > 5033.) & (x_exp < 5220.)
+            # right boundary is a little bit bigger than for theoretical, because there might be huge shifts. Anyway it will be implicitly cut during standardization step; Left boundary empirically optimized
+            x_exp_mask, y_exp_mask = np.copy(x_exp[mask]), np.copy(y_exp[mask])
 
         # 2 deTrending - substract the line
-        y_detrend = self.modifier.detrend_by_line_from_2left_right_minpoints(x_exp_mask, y_exp_mask)
+        with profiler.stage("detrend", y_exp_mask):
+            y_detrend = self.modifier.detrend_by_line_from_2left_right_minpoints(x_exp_mask, y_exp_mask)
 
         # 3 standardizing - make x grid similar to all spectra (includes interpolation to increase/decrease the number of X,Y points)
-        x_std, y_std = self.modifier.make_standard_xgrid_spectrum(x_exp_mask, y_detrend)
+        with profiler.stage("standardize", y_detrend):
+            x_std, y_std = self.modifier.make_standard_xgrid_spectrum(x_exp_mask, y_detrend)
 
         # 4 translation maximum - align to theoretical  5165.2A
-        y_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_std, y_std, expected_max=5165.2,
-                                                                        max_region=200.,
-                                                                        line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
+        with profiler.stage("shift", y_std):
+            y_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines(x_std, y_std, expected_max=5165.2,
+                                                                            max_region=200.,
+                                                                            line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
 
         # 5 normilize - devide by max C2 intensity
-        y_exp_new = self.modifier.normalize_by_division_with_max_intensity(x_std, y_shiftedC2)
+        with profiler.stage("normalize", y_shiftedC2):
+            y_exp_new = self.modifier.normalize_by_division_with_max_intensity(x_std, y_shiftedC2)
 
         return x_std, y_exp_new
 
+    def get_std_xy_2d(self, x_exp, y2d_exp, mask_bounds = (5033., 5220.), grid = (5036., 5200., 50), expected_max = 5165.2,
+                      alignment = 'integer'):
+        """
+            Preprocessed Intensity matrix - batch version of get_std_xy for the whole raster scan
+            @param x_exp: (np.array) experimental wavelength (in A) shared by all spectra
+            @param y2d_exp: (2D np.array) experimental intensity, one spectrum per row (n_spectra, len(x_exp))
+            @param mask_bounds: (left, right) boundaries in A of Swan Band (0,0) region (default (5033, 5220) as get_std_xy)
+            @param grid: (start, stop, num) of standard x grid in A (default (5036, 5200, 50))
+            @param expected_max: expected position in A of C2 peak used for alignment (default 5165.2)
+            @param alignment: 'integer' - shift by whole grid steps with NaN at edges (as get_std_xy),
+                'parabolic' or 'xcorr' - sub-pixel shift without NaN (see SpectrumModifier.translate_OY_along_x_to_merge_lines_subpixel_2d)
+
+            @return np.array (x, y) : standard x - array of wavelength in A, y - 2D array (n_spectra, 50) of intensity in Arb. Units
+        """
+
+        # transform wavelength: nm --> A
+        x_exp, y2d_exp = x_exp * 10, np.asarray(y2d_exp, dtype='float64') * 10
+
+        # 1 masking - working only with Swan Band (0,0)
+        with profiler.stage("mask", y2d_exp):
+            mask = (x_exp > mask_bounds[0]) & (x_exp < mask_bounds[1])
+            x_exp_mask, y2d_exp_mask = x_exp[mask], y2d_exp[:, mask]
+
+        # 2 deTrending - substract the line
+        with profiler.stage("detrend", y2d_exp_mask):
+            y2d_detrend = self.modifier.detrend_by_line_from_2left_right_minpoints_2d(x_exp_mask, y2d_exp_mask)
 
+        # 3 standardizing - one interpolation basis for all rows
+        with profiler.stage("standardize", y2d_detrend):
+            x_std, y2d_std = self.modifier.make_standard_xgrid_spectra(x_exp_mask, y2d_detrend, grid[0], grid[1], grid[2])
 
+        # 4 translation maximum - align to theoretical  5165.2A
+        with profiler.stage("shift", y2d_std):
+            if alignment == 'integer':
+                y2d_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines_2d(x_std, y2d_std, expected_max=expected_max,
+                                                                                     max_region=200.,
+                                                                                     line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
+            else:
+                y2d_shiftedC2 = self.modifier.translate_OY_along_x_to_merge_lines_subpixel_2d(x_std, y2d_std, expected_max=expected_max,
+                                                                                              max_region=200.,
+                                                                                              line=Consts.C2_SWAN_BAND['vibr trans (0,0)'],
+                                                                                              method=alignment)
+
+        # 5 normilize - devide by max C2 intensity
+        with profiler.stage("normalize", y2d_shiftedC2):
+            y2d_exp_new = self.modifier.normalize_by_division_with_max_intensity_2d(x_std, y2d_shiftedC2)
 
+        return x_std, y2d_exp_new
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class SwanTemperatureFitter:
+    """
+        Nearest-neighbour fitting of standardized experimental spectra to the clean theoretical library (e.g. "40channels.pkl"):
+        for every spectrum returns (T_rot, T_vib) of the closest library spectrum and RMS residual between them.
+        Physically interpretable counterpart of random forest prediction.
+    """
+
+    def __init__(self, library, t_rot, t_vib, method = 'brute'):
+        """
+            Constructor
+            @param library: 2D np.array (n_library, n_channels) of standardized theoretical spectra
+            @param t_rot: np.array (n_library,) of rotational temperatures in K
+            @param t_vib: np.array (n_library,) of vibrational temperatures in K
+            @param string method: 'brute' - chunked BLAS distance computation, 'kdtree' - build spatial index once
+                (library spectra lie on 2D (T_rot, T_vib) surface, so the tree is fast for low-noise spectra) (default 'brute')
+
+            @return: no return value
+        """
+        self.library = np.ascontiguousarray(library, dtype='float32')
+        self.t_rot = np.asarray(t_rot, dtype='float64')
+        self.t_vib = np.asarray(t_vib, dtype='float64')
+        self.method = method
+        self.tree = cKDTree(self.library) if method == 'kdtree' else None
+        self.library_norm2 = np.einsum('ij,ij->i', self.library, self.library)
+
+    @staticmethod
+    def from_channels_frame(df, n_channels = 40):
+        """
+            Makes fitter from DataFrame in format of "40channels.pkl": first (0) row is the wavelength in A,
+            first n_channels columns are features, 'Trot' and 'Tvib' columns are labels
+            @param df: pandas DataFrame
+            @param int n_channels: number of feature columns (default 40)
+
+            @return SwanTemperatureFitter
+        """
+        values = df.iloc[1:]
+        return SwanTemperatureFitter(np.array(values.iloc[:, :n_channels].values, dtype='float32'),
+                                     values['Trot'].values, values['Tvib'].values)
+
+    def nearest_brute(self, spectra, pixel_chunk = 512, library_chunk = 32768):
+        """
+            Index of the closest library spectrum by chunked |a|^2 - 2ab + |b|^2 (matrix products, running minimum over library chunks)
+            @param spectra: 2D np.array (n_spectra, n_channels)
+            @param int pixel_chunk: spectra per block (default 512)
+            @param int library_chunk: library spectra per block (default 32768); memory ~ 4 * pixel_chunk * library_chunk bytes
+
+            @return (index, dist2) : np.arrays of library index and squared distance
+        """
+        spectra = np.ascontiguousarray(spectra, dtype='float32')
+        index = np.zeros(len(spectra), dtype='int64')
+        dist2 = np.full(len(spectra), np.inf)
+        for i in range(0, len(spectra), pixel_chunk):
+            a = spectra[i:i + pixel_chunk]
+            a_norm2 = np.einsum('ij,ij->i', a, a)[:, np.newaxis]
+            for j in range(0, len(self.library), library_chunk):
+                d = self.library_norm2[np.newaxis, j:j + library_chunk] - 2 * np.dot(a, self.library[j:j + library_chunk].T)
+                k = np.argmin(d, axis=1)
+                d_min = d[np.arange(len(a)), k] + a_norm2[:, 0]
+                better = d_min < dist2[i:i + pixel_chunk]
+                index[i:i + pixel_chunk][better] = k[better] + j
+                dist2[i:i + pixel_chunk][better] = d_min[better]
+        return index, np.maximum(dist2, 0)
+
+    def fit(self, spectra):
+        """
+            Best-fitting temperatures for every spectrum
+            @param spectra: 2D np.array (n_spectra, n_channels), NaN are treated as 0 (as in notebook 3a)
+
+            @return (t_rot, t_vib, residual, index) : np.arrays of best T_rot, T_vib in K, RMS residual and library index
+        """
+        spectra = np.nan_to_num(np.asarray(spectra, dtype='float32'))
+        if self.tree is not None:
+            dist, index = self.tree.query(spectra)
+            dist2 = dist ** 2
+        else:
+            index, dist2 = self.nearest_brute(spectra)
+        residual = np.sqrt(dist2 / spectra.shape[1])
+        return self.t_rot[index], self.t_vib[index], residual, index
+
+    def fit_scan(self, x_exp, y2d_exp, standardizator, channels = slice(5, 45)):
+        """
+            Fits whole scan matrix: batch standardization (SwanSpectrumStandardizator.get_std_xy_2d), channels selection, fitting
+            @param x_exp: np.array of experimental wavelength in nm
+            @param y2d_exp: 2D np.array (n_spectra, len(x_exp)) of intensities
+            @param standardizator: SwanSpectrumStandardizator
+            @param channels: channels of the 50-point standard grid used by the library (default 5:45 = 40 channels)
+
+            @return (t_rot, t_vib, residual, index) : see fit
+        """
+        x_std, y_std = standardizator.get_std_xy_2d(x_exp, y2d_exp)
+        return self.fit(y_std[:, channels])
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import io
+import os
+import numpy as np
+from utils.SwanBandSynthesizer import SwanBandSynthesizer
+from utils.pyOESconsts import Consts
+
+
+class SyntheticScanGenerator:
+    """
+        Generator of realistic synthetic inputs in the formats of the experiment:
+            scan position log ("spec_scan_*.txt"), Hamamatsu MPMA file (1024 channels, comma decimals) and SWAN_band files.
+        Spectra contain C2 Swan bands for smooth T_rot, T_vib fields, H_a/H_b lines for a smooth Te field, baseline and noise.
+        Everything is seeded, so the same parameters give the same files.
+    """
+
+    def __init__(self, nx = 56, ny = 100, seed = 0, step_time = 0.52, flyback_time = 1.3, spectrum_period = 0.25,
+                 n_channels = 1024, wl_range = (190., 1000.)):
+        """
+            Constructor
+            @param int nx, ny: raster size (default 56 x 100 as scan 118)
+            @param int seed: random seed (default 0)
+            @param float step_time: time in s of one scanner step (default 0.52)
+            @param float flyback_time: time in s of the return to the next raster row (default 1.3)
+            @param float spectrum_period: time in s between spectra (default 0.25)
+            @param int n_channels: spectrometer channels (default 1024)
+            @param wl_range: spectrometer wavelength range in nm (default 190..1000nm)
+
+            @return: no return value
+        """
+        self.nx, self.ny = nx, ny
+        self.seed = seed
+        self.step_time = step_time
+        self.flyback_time = flyback_time
+        self.spectrum_period = spectrum_period
+        self.wavelength = np.linspace(wl_range[0], wl_range[1], n_channels)
+        self.synthesizer = SwanBandSynthesizer(x=10 * self.wavelength)
+        rng = np.random.RandomState(seed)
+        gx, gy = np.meshgrid(np.linspace(0, 1, nx), np.linspace(0, 1, ny), indexing='ij')
+        phase = rng.uniform(0, 2 * np.pi, 3)
+        self.t_rot = 2000. + 800. * np.sin(3 * gx + phase[0]) * np.cos(2 * gy + phase[1])
+        self.t_vib = 3000. + 500. * np.cos(2 * gx + gy + phase[2])
+        self.te = 0.6 + 0.3 * np.exp(-((gx - 0.5) ** 2 + (gy - 0.5) ** 2) / 0.1)
+
+    def scan_times(self):
+        """
+            @return np.array (nx * ny,) of scanner times in s from scan start, raster goes row by row
+        """
+        cell = np.arange(self.nx * self.ny)
+        return cell * self.step_time + (cell // self.ny) * self.flyback_time
+
+    def write_scan_log(self, file_name, start = 13 * 3600. + 18 * 60. + 7.156254):
+        """
+            Writes scanner position log in the format of "spec_scan_*.txt"
+            @param string file_name: output file
+            @param float start: time of the first point in s from midnight (default 13:18:07.156254)
+
+            @return: no return value
+        """
+        t = (self.scan_times() + start) % 86400.
+        with open(file_name, 'w') as f:
+            f.write("#first line - comment, second - resolution n, m, third - wavelengths, fourth and further - point coordinates "
+                    "i, j and spectraIntegration time us: 500000Step - 6\n")
+            f.write("%d %d\n" % (self.nx, self.ny))
+            f.write("4.00 5.00 6.00\n")
+            for k, tk in enumerate(t):
+                h, rest = divmod(tk, 3600.)
+                m, s = divmod(rest, 60.)
+                f.write("%d %d %02d:%02d:%09.6f\n" % (k // self.ny, k % self.ny, h, m, s))
+
+    def spectra(self, cells, rng):
+        """
+            Synthetic spectra for raster cells
+            @param cells: np.array of flat cell indices (x * ny + y)
+            @param rng: np.random.RandomState
+
+            @return 2D np.array (len(cells), n_channels)
+        """
+        x, y = cells // self.ny, cells % self.ny
+        wl = 10 * self.wavelength
+        _, swan = self.synthesizer.swan_spectra(self.t_rot[x, y], self.t_vib[x, y], full_width=15.)
+        amp = 1000. * (1. + 0.5 * np.sin(0.2 * x + 0.1 * y))
+        intens = amp[:, np.newaxis] * swan
+        te = self.te[x, y][:, np.newaxis]
+        sigma = 15. / 2.355
+        for line in ('656nm 3to2 Red 1.89eV', '486nm 4to2 Aqua 2.55eV'):
+            n, g, a = Consts.H_BALMER_ATOMIC_DATA[line]
+            energy = Consts.RYDBERG_H_EV * (1. - 1. / n ** 2)
+            lam = Consts.H_BETTA_ANG[line]
+            peak = 0.05 * g * a / lam * np.exp(-(energy - 12.) / te)
+            intens += peak * np.exp(-0.5 * ((wl[np.newaxis, :] - lam) / sigma) ** 2)
+        intens += 20. + 0.005 * (wl[np.newaxis, :] - wl[0])
+        intens += rng.normal(0., 5., intens.shape)
+        return intens
+
+    def write_mpma(self, file_name, time_offset = 6.156, chunk_rows = 2000):
+        """
+            Writes Hamamatsu MPMA file (tab separated, comma decimals, wavelength header row); spectra are generated and written
+            in chunks, memory does not depend on raster size
+            @param string file_name: output file
+            @param float time_offset: spectrometer starts earlier than scanner by this time in s (default 6.156)
+            @param int chunk_rows: spectra per chunk (default 2000)
+
+            @return int : number of spectra
+        """
+        rng = np.random.RandomState(self.seed + 1)
+        scan_t = self.scan_times()
+        spec_t = np.arange(0., scan_t[-1] + self.step_time + time_offset, self.spectrum_period)
+        with open(file_name, 'w') as f:
+            f.write("\t" + "\t".join(("%.2f" % v).replace('.', ',') for v in self.wavelength) + "\n")
+            for i in range(0, len(spec_t), chunk_rows):
+                t = spec_t[i:i + chunk_rows]
+                cell = np.clip(np.searchsorted(scan_t, t - time_offset, side='right') - 1, 0, None)
+                block = np.column_stack((t, self.spectra(cell, rng)))
+                # savetxt formats a block in C, decimal points are swapped on the whole text
+                buf = io.StringIO()
+                np.savetxt(buf, block, fmt='%.3f', delimiter='\t')
+                f.write(buf.getvalue().replace('.', ','))
+        return len(spec_t)
+
+    def write_swan_band_files(self, directory, t_rot, t_vib):
+        """
+            Writes modeled spectra in the format of "SWAN_band" files (4 header lines and two columns)
+            @param string directory: output folder (e.g. 'modeled spectra')
+            @param t_rot, t_vib: np.arrays of temperatures in K
+
+            @return list of file names
+        """
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        synthesizer = SwanBandSynthesizer()
+        x, y = synthesizer.swan_spectra(t_rot, t_vib)
+        names = []
+        for tr, tv, row in zip(t_rot, t_vib, y):
+            name = "Trot%dTvib%dDefault.txt" % (tr, tv)
+            with open(os.path.join(directory, name), 'w') as f:
+                f.write(" Trot = %.1f\n Tvib = %.1f\n Imax = %.5E\n N0 = %.5E\n" % (tr, tv, row.max(), 1.))
+                f.write("\n".join("%.3f %.6E" % xy for xy in zip(x, row)) + "\n")
+            names.append(name)
+        return names
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+Created on 18.10.2026
+"""
+
+import os
+import json
+import numpy as np
+from utils.SpectrumModifier import SpectrumModifier
+from utils.SwanBandSynthesizer import SwanBandSynthesizer
+from utils.pyOESconsts import Consts
+
+
+class TrainingDataStore:
+    """
+        On-disk training set of standardized Swan spectra (replacement of "40channels.pkl" + "40chan_noisy3add_norm.pkl" joined
+        by DataFrame.append). Store is a folder of float32 .npy files opened by memory mapping:
+            features.npy - (n_rows, n_channels) standardized spectra
+            labels.npy - (n_rows, 2) [Trot, Tvib] in K
+            copy.npy - (n_rows,) 0 for clean spectra, k for k-th noisy copy
+            wavelength.npy - (n_channels,) wavelength of features in A (the row 0 of the pkl files)
+            meta.json - generation parameters
+        Rows are ordered as after append: all clean spectra, then the first noisy copy of all of them, then the second, ...
+        sklearn estimators accept features/labels memmaps, but fit reads all given features into RAM (as float32) and converts
+        labels to float64, so training takes a subsample of rows (see ForestSweep max_train_rows); evaluation can go by
+        iter_batches without loading the whole set.
+    """
+
+    def __init__(self, path):
+        """
+            Constructor, does not touch the disk (see TrainingDataGenerator.generate and open)
+            @param string path: store folder
+
+            @return: no return value
+        """
+        self.path = path
+        self.meta = None
+        self.features = self.labels = self.copy = self.wavelength = None
+
+    def _file(self, name):
+        return os.path.join(self.path, name + ".npy")
+
+    def create(self, wavelength, n_rows, meta):
+        """
+            Creates empty store of n_rows rows
+            @param wavelength: np.array of feature wavelength in A
+            @param int n_rows: number of rows
+            @param dict meta: generation parameters (json-serializable)
+
+            @return self opened for writing
+        """
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        n_channels = len(wavelength)
+        np.save(self._file("wavelength"), np.asarray(wavelength, dtype='float64'))
+        for name, shape, dtype in (("features", (n_rows, n_channels), 'float32'), ("labels", (n_rows, 2), 'float32'),
+                                   ("copy", (n_rows,), 'int16')):
+            arr = np.lib.format.open_memmap(self._file(name), mode='w+', dtype=dtype, shape=shape)
+            del arr
+        self.meta = dict(meta, n_rows=int(n_rows), n_channels=int(n_channels), complete=False)
+        self._write_meta()
+        return self.open(mode='r+')
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), 'w') as f:
+            json.dump(self.meta, f, indent=1)
+
+    def open(self, mode = 'r'):
+        """
+            Opens existing store by memory mapping
+            @param string mode: 'r' - read only, 'r+' - writable (default 'r')
+
+            @return self
+        """
+        with open(os.path.join(self.path, "meta.json"), 'r') as f:
+            self.meta = json.load(f)
+        self.features = np.load(self._file("features"), mmap_mode=mode)
+        self.labels = np.load(self._file("labels"), mmap_mode=mode)
+        self.copy = np.load(self._file("copy"), mmap_mode=mode)
+        self.wavelength = np.load(self._file("wavelength"))
+        return self
+
+    def mark_complete(self):
+        self.features.flush()
+        self.labels.flush()
+        self.copy.flush()
+        self.meta["complete"] = True
+        self._write_meta()
+
+    def __len__(self):
+        return self.meta["n_rows"]
+
+    def iter_batches(self, batch_rows = 65536, rows = None, shuffle = False, seed = 0):
+        """
+            Streams the store by batches, only one batch is in memory
+            @param int batch_rows: rows per batch (default 65536)
+            @param rows: optional np.array of row indices (e.g. test part, see split) (default None - all rows)
+            @param Boolean shuffle: random order of batches; rows inside a batch stay sorted for sequential disk reading (default False)
+            @param int seed: random seed of shuffle
+
+            @return generator of (features, labels) : float32 2D np.arrays (n, n_channels) and (n, 2)
+        """
+        n = len(self) if rows is None else len(rows)
+        starts = np.arange(0, n, batch_rows)
+        if shuffle:
+            starts = np.random.RandomState(seed).permutation(starts)
+        for start in starts:
+            if rows is None:
+                yield np.array(self.features[start:start + batch_rows]), np.array(self.labels[start:start + batch_rows])
+            else:
+                index = np.sort(rows[start:start + batch_rows])
+                yield self.features[index], self.labels[index]
+
+    def split(self, test_fraction = 0.2, seed = 0):
+        """
+            Random train/test split of row indices (as train_test_split, but without touching the data)
+            @param float test_fraction: part of rows in test set (default 0.2)
+            @param int seed: random seed (default 0)
+
+            @return (train_rows, test_rows) : sorted np.arrays of row indices
+        """
+        order = np.random.RandomState(seed).permutation(len(self))
+        n_test = int(round(test_fraction * len(self)))
+        return np.sort(order[n_test:]), np.sort(order[:n_test])
+
+
+class TrainingDataGenerator:
+    """
+        Generates clean and noisy augmented training spectra chunk by chunk into TrainingDataStore, so the library may be larger
+        than memory (finer T_vib step, more noise copies). Theoretical spectra are synthesized by SwanBandSynthesizer and
+        standardized as SwanSpectrumStandardizator.get_spectrum does (mask, cubic interpolation to the standard grid,
+        alignment of C2 (0,0) peak, normalization), then the feature channels are cut.
+        Noisy copy: gaussian noise of std noise_level (in units of the normalized peak) is added and the spectrum is normalized again.
+        Every chunk has its own random stream made of (seed, chunk index), so the same seed and chunk_rows give the same store.
+    """
+
+    def __init__(self, n_noisy = 3, noise_level = 0.03, seed = 0, channels = slice(5, 45), grid = (5036., 5200., 50),
+                 synthesizer = None):
+        """
+            Constructor
+            @param int n_noisy: number of noisy copies of every clean spectrum (default 3 as "noisy3add")
+            @param float noise_level: std of added noise relative to the normalized peak (default 0.03)
+            @param int seed: random seed (default 0)
+            @param channels: standard grid channels used as features (default 5:45 - 40 channels)
+            @param grid: (start, stop, num) of standard x grid in A (default (5036, 5200, 50))
+            @param synthesizer: SwanBandSynthesizer (default - 4800..5200.8A with 0.1A step as exe generates)
+
+            @return: no return value
+        """
+        self.n_noisy = n_noisy
+        self.noise_level = noise_level
+        self.seed = seed
+        self.channels = channels
+        self.grid = grid
+        self.synthesizer = SwanBandSynthesizer() if synthesizer is None else synthesizer
+        self.modifier = SpectrumModifier()
+        # interpolation operator is the same for all chunks
+        x = self.synthesizer.x
+        self.mask = (x > 5033.) & (x < 5200.5)
+        self.x_std, self.basis = self.modifier.make_standard_xgrid_basis(x[self.mask], grid[0], grid[1], grid[2])
+
+    def standardize(self, y2d):
+        """
+            Standardization of theoretical spectra (batch version of SwanSpectrumStandardizator.get_spectrum)
+            @param y2d: 2D np.array of synthesized spectra on synthesizer.x
+
+            @return 2D np.array (n_spectra, num) on self.x_std
+        """
+        y_std = np.dot(y2d[:, self.mask], self.basis.T)
+        y_std = self.modifier.translate_OY_along_x_to_merge_lines_2d(self.x_std, y_std, expected_max=5165.2, max_region=200.,
+                                                                     line=Consts.C2_SWAN_BAND['vibr trans (0,0)'])
+        return self.modifier.normalize_by_division_with_max_intensity_2d(self.x_std, y_std)
+
+    def add_noise(self, features, rng):
+        """
+            Noisy copy of standardized spectra
+            @param features: 2D np.array of clean features
+            @param rng: np.random.RandomState
+
+            @return 2D np.array of renormalized noisy features
+        """
+        noisy = features + rng.normal(0., self.noise_level, features.shape)
+        return noisy / np.amax(noisy, axis=1)[:, np.newaxis]
+
+    def generate(self, path, t_rot, t_vib, chunk_rows = 16384):
+        """
+            Writes training store
+            @param string path: store folder
+            @param t_rot, t_vib: np.arrays of temperatures in K of clean library (e.g. flattened meshgrid)
+            @param int chunk_rows: clean spectra synthesized at once; memory ~ chunk_rows * len(synthesizer.x) * 8 bytes (default 16384)
+
+            @return TrainingDataStore opened for reading
+        """
+        t_rot = np.asarray(t_rot, dtype='float64').ravel()
+        t_vib = np.asarray(t_vib, dtype='float64').ravel()
+        n_clean = len(t_rot)
+        meta = {"n_clean": n_clean, "n_noisy": self.n_noisy, "noise_level": self.noise_level, "seed": self.seed,
+                "channels": [self.channels.start, self.channels.stop], "grid": list(self.grid), "chunk_rows": chunk_rows}
+        store = TrainingDataStore(path).create(self.x_std[self.channels], n_clean * (1 + self.n_noisy), meta)
+        for chunk, start in enumerate(range(0, n_clean, chunk_rows)):
+            tr, tv = t_rot[start:start + chunk_rows], t_vib[start:start + chunk_rows]
+            _, y = self.synthesizer.swan_spectra(tr, tv)
+            features = self.standardize(y)[:, self.channels]
+            features[np.isnan(features)] = 0
+            labels = np.column_stack((tr, tv))
+            rng = np.random.RandomState([self.seed, chunk])
+            for copy in range(self.n_noisy + 1):
+                rows = slice(copy * n_clean + start, copy * n_clean + start + len(tr))
+                store.features[rows] = features if copy == 0 else self.add_noise(features, rng)
+                store.labels[rows] = labels
+                store.copy[rows] = copy
+        store.mark_complete()
+        return TrainingDataStore(path).open()
@@ -11,6 +11,18 @@ class Consts:
         '384nm 9to2 UV 3.23eV': 3835.384,
         '365nm INFto2 UV 3.40eV': 3646
     }
+    H_BALMER_ATOMIC_DATA = {
+        # source https://physics.nist.gov/PhysRefData/ASD/lines_form.html (fine structure summed)
+        # (upper level n, statistical weight g_k = 2n^2, transition probability A_ki in s-1), same keys as H_BETTA_ANG
+        '656nm 3to2 Red 1.89eV': (3, 18, 4.4101e7),
+        '486nm 4to2 Aqua 2.55eV': (4, 32, 8.4193e6),
+        '434nm 5to2 Blue 2.86eV': (5, 50, 2.5304e6),
+        '411nm 6to2 Violet 3.03eV': (6, 72, 9.7320e5),
+        '397nm 7to2 UV 3.13eV': (7, 98, 4.3889e5),
+        '389nm 8to2 UV 3.19eV': (8, 128, 2.2148e5),
+        '384nm 9to2 UV 3.23eV': (9, 162, 1.2156e5)
+    }
+    RYDBERG_H_EV = 13.5984  # hydrogen ionization energy, E_n = RYDBERG_H_EV * (1 - 1/n^2)
     C2_SWAN_BAND = {
         # source Ochkin  all in Angstrom
         "vibr trans (3,2)": 4698,